@@ -0,0 +1,30 @@
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for linktest
+from linktest.can import load_can_log
+from linktest.can_timing import timing_summary
+from linktest.plots import can_timing_figure
+
+def main():
+    log_dir = Path(__file__).resolve().parent.parent
+    graphs_dir = log_dir / "graphs"
+    graphs_dir.mkdir(exist_ok=True)
+
+    for csv_file in sorted(log_dir.glob('*.csv')):
+        print(f"\nProcessing {csv_file.name}...")
+        log = load_can_log(csv_file)
+        if len(log) == 0:
+            print(f"No frames in {csv_file.name}")
+            continue
+
+        # Period, jitter percentiles, missed cycles and burst lengths per ID
+        summary = timing_summary(log)
+        print(summary.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+        summary.to_csv(graphs_dir / f"{csv_file.stem}_can_timing.csv", index=False)
+
+        # Inter-arrival and burst-loss histograms, one column per CAN ID
+        can_timing_figure(log, csv_file.stem, graphs_dir)
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,25 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for linktest
+from linktest.metrics import bin_metrics
+from linktest.render import finish_figure
+from linktest.sidecar import open_sidecar
+
+# Time range plotted (ms)
+START_MS = 5000
+END_MS = 20000
 
 def process_file(file_path):
     """Process a single CSV file and return success rate and PPS data"""
-    df = pd.read_csv(file_path)
-    
-    # bin size in milliseconds
-    bin_size = 100
-    df['Bin'] = (df['Timestamp_ms'] // bin_size).astype(int)
-    
-    # Group and calculate statistics
-    grouped = df.groupby('Bin').agg(
-        total=('Index', 'size'),
-        successes=('Indicator', 'sum')
-    ).reset_index()
+    # Only the rows of the plotted range, straight out of the memory-mapped
+    # sidecar (up to the end of the last 100 ms bin that starts in range)
+    sidecar = open_sidecar(file_path)
+    df = sidecar.to_frame(sidecar.time_range(START_MS, END_MS + 99))
     
-    # Calculate metrics
-    grouped['success_rate'] = (grouped['successes'] / grouped['total']) * 100
-    grouped['packets_per_second'] = grouped['successes'] * (1000 / bin_size)
-    grouped['bin_start'] = grouped['Bin'] * bin_size
+    # Success rate and packets per second in 100 ms bins, one grouped pass
+    grouped = bin_metrics(df, bin_size=100, time_column='Timestamp_ms', by_config=False)
     
     return grouped
 
@@ -48,8 +48,8 @@ def main():
     # Plot 1: Success Rate Comparison
     plt.figure(figsize=(12, 6))
     for (label, grouped), color in zip(data.items(), colors):
-        # Filter data between 5000 and 20000 ms
-        mask = (grouped['bin_start'] >= 5000) & (grouped['bin_start'] <= 20000)
+        # Filter data to the plotted range
+        mask = (grouped['bin_start'] >= START_MS) & (grouped['bin_start'] <= END_MS)
         filtered_data = grouped[mask]
         
         plt.plot(filtered_data['bin_start'], filtered_data['success_rate'],
@@ -62,18 +62,17 @@ def main():
     plt.grid(True, alpha=0.3)
     plt.grid(True, which='minor', alpha=0.15)
     plt.minorticks_on()
-    plt.xlim(5000, 20000)  # Set x-axis limits
+    plt.xlim(START_MS, END_MS)  # Set x-axis limits
     plt.ylim(0, 100)  # Set y-axis limits from 0 to 100%
     plt.legend()
     plt.tight_layout()
-    plt.savefig(graphs_dir / "success_rate_comparison.png", facecolor='white')
-    plt.show()
+    finish_figure(graphs_dir / "success_rate_comparison.png", facecolor='white')
     
     # Plot 2: Packets per Second Comparison
     plt.figure(figsize=(12, 6))
     for (label, grouped), color in zip(data.items(), colors):
-        # Filter data between 5000 and 20000 ms
-        mask = (grouped['bin_start'] >= 5000) & (grouped['bin_start'] <= 20000)
+        # Filter data to the plotted range
+        mask = (grouped['bin_start'] >= START_MS) & (grouped['bin_start'] <= END_MS)
         filtered_data = grouped[mask]
         
         plt.plot(filtered_data['bin_start'], filtered_data['packets_per_second'],
@@ -86,11 +85,10 @@ def main():
     plt.grid(True, alpha=0.3)
     plt.grid(True, which='minor', alpha=0.15)
     plt.minorticks_on()
-    plt.xlim(5000, 20000)  # Set x-axis limits
+    plt.xlim(START_MS, END_MS)  # Set x-axis limits
     plt.legend()
     plt.tight_layout()
-    plt.savefig(graphs_dir / "pps_comparison.png", facecolor='white')
-    plt.show()
+    finish_figure(graphs_dir / "pps_comparison.png", facecolor='white')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
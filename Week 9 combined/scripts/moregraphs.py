@@ -3,14 +3,17 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 from datetime import datetime
 import numpy as np
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for linktest
+from linktest.cache import load_csv
+from linktest.render import finish_figure
 
 def main():
     current_dir = Path(__file__).parent
     csv_path = current_dir / "DRIVINGONEMBPS250kbpsnew.csv"
-    df = pd.read_csv(csv_path)
-    
-    # Convert CurrentTime strings to datetime objects
-    df['CurrentTime'] = pd.to_datetime(df['CurrentTime'], format='%H:%M:%S')
+    # Typed frame from the cache, CurrentTime already parsed to datetime
+    df = load_csv(csv_path)
     
     # Calculate time differences using Timestamp_ms
     df['time_elapsed'] = df['Timestamp_ms'].diff().fillna(0)
@@ -94,8 +97,7 @@ def main():
     plt.minorticks_on()  # Enable minor ticks
     plt.legend()
     plt.tight_layout()
-    plt.savefig(graphs_dir / f"{base_name}_success_rate.png", facecolor='white')
-    plt.show()
+    finish_figure(graphs_dir / f"{base_name}_success_rate.png", facecolor='white')
 
     # Plot 2: Packets per Second with both rolling averages
     plt.figure(figsize=(12, 6))
@@ -117,8 +119,7 @@ def main():
     plt.grid(True, alpha=0.3)
     plt.legend()
     plt.tight_layout()
-    plt.savefig(graphs_dir / f"{base_name}_pps_ms.png", facecolor='white')
-    plt.show()
+    finish_figure(graphs_dir / f"{base_name}_pps_ms.png", facecolor='white')
 
     # Plot 3: Average Data Rate with both rolling averages
     plt.figure(figsize=(12, 6))
@@ -137,8 +138,7 @@ def main():
     plt.grid(True, alpha=0.3)
     plt.legend()
     plt.tight_layout()
-    plt.savefig("data_rate_plot.png", facecolor='white')
-    plt.show()
+    finish_figure("data_rate_plot.png", facecolor='white')
 
     # Plot 4: Time Elapsed Between Packets with both rolling averages
     plt.figure(figsize=(12, 6))
@@ -157,8 +157,7 @@ def main():
     plt.grid(True, alpha=0.3)
     plt.legend()
     plt.tight_layout()
-    plt.savefig("time_elapsed_plot.png", facecolor='white')
-    plt.show()
+    finish_figure("time_elapsed_plot.png", facecolor='white')
 
     # Create new plot for time-based packets per second with counter colors
     plt.figure(figsize=(12, 6))
@@ -224,10 +223,9 @@ def main():
     plt.grid(True, alpha=0.3)
     plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.tight_layout()
-    plt.savefig(graphs_dir / f"{base_name}_pps_time.png", 
-                facecolor='white', 
-                bbox_inches='tight')
-    plt.show()
+    finish_figure(graphs_dir / f"{base_name}_pps_time.png", 
+                  facecolor='white', 
+                  bbox_inches='tight')
 
 if __name__ == '__main__':
     main()
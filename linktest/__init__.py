@@ -0,0 +1,6 @@
+"""
+Shared tooling for the nRF24 link tests.
+
+The per-day scripts in 19032025/ and Week 9 combined/ import from here so
+the heavy lifting (gap filling, loading, metrics) lives in one place.
+"""
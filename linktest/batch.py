@@ -0,0 +1,76 @@
+"""
+Process-pool batch runner for per-file work over whole dataset directories.
+
+Each file (parse, gap-fill, metrics, plots) is independent, so the files of
+a test day are farmed out to a pool of worker processes. Results come back
+in input order whatever order the workers finish in, and a file that fails
+is reported and skipped instead of stopping the batch.
+"""
+import os
+from pathlib import Path
+
+from . import instrument
+
+
+def default_workers():
+    """Pool size from the LINKTEST_WORKERS env var, otherwise one per CPU."""
+    return int(os.environ.get('LINKTEST_WORKERS', 0)) or os.cpu_count() or 1
+
+
+def _call(func, path):
+    """Runs one job, turning an exception into an error message."""
+    with instrument.stage('file', file=Path(path).name):
+        try:
+            return True, func(path)
+        except Exception as e:
+            return False, f"{type(e).__name__}: {e}"
+
+
+def _call_in_worker(func, path):
+    """_call() in a pool worker, sending the stage timings back with the result."""
+    ok, value = _call(func, path)
+    return ok, value, instrument.drain() if instrument.ENABLED else None
+
+
+def run_batch(func, paths, workers=None):
+    """
+    Runs func(path) for every path, spread over a process pool.
+
+    - 'func' has to be picklable: a module-level function, or a
+      functools.partial of one for the extra arguments
+    - 'workers' defaults to default_workers(); 1 runs everything in this
+      process, which is easier to debug
+    Returns (results, failures): results is a list of (path, value) and
+    failures a list of (path, message), both in the order of 'paths' so the
+    merged output doesn't depend on which worker finished first.
+    """
+    paths = list(paths)
+    workers = min(workers or default_workers(), len(paths))
+
+    if workers <= 1:
+        outcomes = [_call(func, path) for path in paths]
+    else:
+        # Imported here: multiprocessing takes longer to import than a small job takes to run
+        from concurrent.futures import ProcessPoolExecutor
+
+        outcomes = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_call_in_worker, func, path) for path in paths]
+            for future in futures:
+                try:
+                    ok, value, recorded = future.result()
+                    if recorded:
+                        instrument.merge(recorded)
+                    outcomes.append((ok, value))
+                except Exception as e:
+                    # Worker died outright (killed, out of memory, ...)
+                    outcomes.append((False, f"{type(e).__name__}: {e}"))
+
+    results, failures = [], []
+    for path, (ok, value) in zip(paths, outcomes):
+        if ok:
+            results.append((path, value))
+        else:
+            print(f"Error processing {Path(path).name}: {value}")
+            failures.append((path, value))
+    return results, failures
@@ -0,0 +1,315 @@
+"""
+Benchmarks for the ingestion, gap-fill, metrics and plotting hot paths.
+
+A synthetic raw capture in the readserial.py layout is generated with a
+seeded RNG, with random loss, burst gaps and a DataRate/PowerLevel switch
+every so many packets, then run through the same library calls the
+scripts use: read_dataset() (parse), fill_gaps() (gap-fill),
+config_summary() (grouped metrics), pyramid_table() and a 1 s
+Pyramid.bins() query (packet-rate pyramid), loss-run histograms and a
+Gilbert fit of the whole Indicator stream (channel) and a headless
+success-rate plot (render). Each stage reports its best time over the repeats, packets per
+second and the process's peak RSS afterwards. Results are written as JSON,
+and compare() prints the speed-up per stage between two result files so a
+change can be checked against the commit before it.
+
+--startup instead times cold starts of the quick commands ('capture' and
+'fill' on a small capture) in fresh interpreters, checks they didn't
+import NumPy, pandas or matplotlib and fails if one takes longer than
+STARTUP_BUDGET_MS.
+
+    python -m linktest.bench --packets 1e6 --output bench.json
+    python -m linktest.bench --packets 1e6 --compare old.json
+    python -m linktest.bench --startup
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import instrument
+from .instrument import peak_rss_mb
+
+# DataRate, PowerLevel pairs cycled through like a switch test
+DEFAULT_CONFIGS = [(2, 0), (2, 1), (2, 2), (2, 3), (1, 3), (250, 3)]
+
+# Cold start, interpreter included, allowed for the quick commands
+STARTUP_BUDGET_MS = 100
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib')
+STARTUP_PACKETS = 2000
+
+# Runs 'python -m linktest <argv>' (or just imports) in a fresh interpreter,
+# then reports which heavy modules got loaded on its last line
+_PROBE = """import sys
+{body}
+print('heavy:' + ','.join(m for m in {heavy!r} if m in sys.modules))
+"""
+_RUN_CLI = """import runpy
+sys.argv = {argv!r}
+try:
+    runpy.run_module('linktest', run_name='__main__', alter_sys=True)
+except SystemExit:
+    pass"""
+
+
+def synthetic_packets(first, count, loss=0.02, burst_every=20000, burst_len=200,
+                      configs=DEFAULT_CONFIGS, switch_every=30000, rate=500, seed=0):
+    """
+    Received packets for indices first .. first + count - 1 as a dict of
+    arrays (Timestamp seconds of day, Millis, Index, DataRate, PowerLevel).
+
+    - 'loss' is the chance of losing any single packet
+    - on average one burst of 'burst_len' lost packets every 'burst_every'
+    - the config moves on to the next of 'configs' every 'switch_every' indices
+    - 'rate' is packets per second on the Teensy clock
+    The same arguments always give the same packets.
+    """
+    rng = np.random.default_rng([seed, first])
+    index = np.arange(first, first + count, dtype=np.int64)
+    received = rng.random(count) >= loss
+    if burst_every and burst_len:
+        starts = rng.integers(0, count, max(count // burst_every, 0))
+        edges = np.zeros(count + 1, dtype=np.int64)
+        np.add.at(edges, starts, 1)
+        np.add.at(edges, np.minimum(starts + burst_len, count), -1)
+        received &= np.cumsum(edges[:-1]) == 0
+    index = index[received]
+
+    millis = 1000 + (index * 1000) // rate + rng.integers(0, 2, len(index))
+    config = np.asarray(configs, dtype=np.int64)[((index - 1) // switch_every) % len(configs)]
+    return {
+        'Timestamp': 12 * 3600 + millis // 1000,
+        'Millis': millis,
+        'Index': index,
+        'DataRate': config[:, 0],
+        'PowerLevel': config[:, 1],
+    }
+
+
+def write_capture(path, packets, chunk=1000000, **kwargs):
+    """
+    Writes a synthetic raw capture of 'packets' indices to 'path' in the
+    headerless HH:MM:SS,millis,index,datarate,powerlevel layout, 'chunk'
+    indices at a time so 1e8 packets don't need 1e8 rows in memory.
+    Keyword arguments go to synthetic_packets(). Returns the lines written.
+    """
+    written = 0
+    with open(path, 'w', newline='') as f:
+        f.write('12:00:00,Timestamp,Index,DataRate,PowerLevel\r\n')
+        for first in range(1, packets + 1, chunk):
+            data = synthetic_packets(first, min(chunk, packets + 1 - first), **kwargs)
+            # Format each distinct second once
+            seconds, inverse = np.unique(data['Timestamp'], return_inverse=True)
+            clock = np.array([f'{s // 3600 % 24:02d}:{s // 60 % 60:02d}:{s % 60:02d}'
+                              for s in seconds.tolist()], dtype=object)
+            data['Timestamp'] = clock[inverse]
+            pd.DataFrame(data).to_csv(f, header=False, index=False, lineterminator='\r\n')
+            written += len(data['Index'])
+    return written
+
+
+def _stage(name, func, packets, repeat, results):
+    """Times func() 'repeat' times, records the best run and returns its value."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    results[name] = {
+        'seconds': best,
+        'packets_per_second': packets / best if best else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    print(f"{name:>13}: {best:8.3f} s  {packets / best:14,.0f} packets/s"
+          + (f"  peak RSS {results[name]['peak_rss_mb']:.0f} MB"
+             if results[name]['peak_rss_mb'] is not None else ''))
+    return value
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(packets=1000000, repeat=3, render=True, workdir=None, **kwargs):
+    """
+    Generates a capture of 'packets' indices and times every stage on it.
+    Keyword arguments go to synthetic_packets(). Returns the results dict
+    that main() writes out as JSON.
+    """
+    from .channel import stream_channel
+    from .gapfill import fill_gaps
+    from .loader import read_dataset
+    from .metrics import bin_metrics, config_summary
+    from .pyramid import Pyramid, pyramid_table
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        capture = Path(tmp) / 'synthetic.csv'
+        start = time.perf_counter()
+        received = write_capture(capture, packets, **kwargs)
+        print(f"Generated {received:,} of {packets:,} packets in "
+              f"{time.perf_counter() - start:.1f} s")
+
+        stages = {}
+        raw = _stage('parse', lambda: read_dataset(capture, parse_times=False),
+                     received, repeat, stages)
+        table = _stage('gapfill', lambda: fill_gaps(
+            raw['Index'], raw['Millis'],
+            {'Timestamp': raw['Timestamp'], 'DataRate': raw['DataRate'],
+             'PowerLevel': raw['PowerLevel']}), received, repeat, stages)
+
+        df = pd.DataFrame(table)
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='%H:%M:%S')
+        _stage('metrics', lambda: config_summary(df), received, repeat, stages)
+        levels = _stage('pyramid build', lambda: pyramid_table(df), received, repeat, stages)
+        pyramid = Pyramid(levels)
+        _stage('pyramid query', lambda: pyramid.bins(1000), received, repeat, stages)
+        indicator = df['Indicator'].to_numpy()
+        _stage('channel', lambda: stream_channel(indicator).summary(), len(indicator), repeat,
+               stages)
+
+        if render:
+            from . import render as render_module
+            render_module.use_headless()
+            plt = render_module.plt
+
+            def plot():
+                bins = bin_metrics(df)
+                plt.figure(figsize=(12, 6))
+                for config, group in bins.groupby('Config', sort=False):
+                    plt.plot(group['bin_start'], group['success_rate'], label=config,
+                             linewidth=0.5)
+                plt.legend()
+                render_module.finish_figure(Path(tmp) / 'success_rate.png', dpi=100)
+
+            _stage('render', plot, received, repeat, stages)
+
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'cpus': os.cpu_count(),
+        'params': {'packets': packets, 'received': received, 'repeat': repeat, **kwargs},
+        'stages': stages,
+    }
+
+
+def _cold_start(body, repeat, env):
+    """Best wall time (ms) of running 'body' in a new interpreter, and the heavy modules it loaded."""
+    code = _PROBE.format(body=body, heavy=HEAVY_MODULES)
+    best, heavy = None, []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                env=env, check=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+        heavy = result.stdout.strip().splitlines()[-1].split(':', 1)[1]
+    return best, [name for name in heavy.split(',') if name]
+
+
+def startup_benchmark(repeat=5, workdir=None):
+    """
+    Cold-start times of the quick commands against STARTUP_BUDGET_MS.
+    Returns {name: {ms, heavy, over_budget}} plus 'python' (a bare
+    interpreter, for reference).
+    """
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).resolve().parents[1]),
+               LINKTEST_WORKERS='1')
+    env.pop('LINKTEST_TRACE', None)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        capture = Path(tmp) / 'small.csv'
+        write_capture(capture, STARTUP_PACKETS)
+        env['LINKTEST_CACHE'] = str(Path(tmp) / 'cache')
+        commands = {
+            'python': 'pass',
+            'cli': 'import linktest.cli',
+            'capture': 'import linktest.cli, linktest.capture, linktest.live',
+            'fill': _RUN_CLI.format(argv=['linktest', 'fill', str(capture)]),
+        }
+        results = {}
+        for name, body in commands.items():
+            ms, heavy = _cold_start(body, repeat, env)
+            over = name != 'python' and (ms > STARTUP_BUDGET_MS or bool(heavy))
+            results[name] = {'ms': ms, 'heavy': heavy, 'over_budget': over}
+            print(f"{name:>10}: {ms:6.0f} ms" + (f"  imports {', '.join(heavy)}" if heavy else '')
+                  + ('  OVER BUDGET' if over else ''))
+    return results
+
+
+def compare(old, new):
+    """
+    Prints the speed-up of every stage in 'new' over 'old' (result dicts),
+    by throughput so runs of different sizes can still be lined up.
+    """
+    if old['params'] != new['params']:
+        print(f"Note: parameters differ ({old['params']} vs {new['params']})")
+    print(f"{'stage':>13}  {'old pkt/s':>12}  {'new pkt/s':>12}  speed-up")
+    for name, stage in new['stages'].items():
+        before = old['stages'].get(name)
+        if before is None:
+            print(f"{name:>13}  {'-':>12}  {stage['packets_per_second']:12,.0f}")
+            continue
+        ratio = stage['packets_per_second'] / before['packets_per_second']
+        flag = '  SLOWER' if ratio < 0.9 else ''
+        print(f"{name:>13}  {before['packets_per_second']:12,.0f}  "
+              f"{stage['packets_per_second']:12,.0f}  {ratio:7.2f}x{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m linktest.bench', description=__doc__.split('\n')[1])
+    parser.add_argument('--packets', type=float, default=1e6, help='indices to generate (1e5 - 1e8)')
+    parser.add_argument('--loss', type=float, default=0.02, help='chance of losing each packet')
+    parser.add_argument('--burst-every', type=int, default=20000, help='mean packets between loss bursts')
+    parser.add_argument('--burst-len', type=int, default=200, help='packets lost per burst')
+    parser.add_argument('--switch-every', type=int, default=30000, help='packets per config')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, best is kept')
+    parser.add_argument('--no-render', action='store_true', help='skip the plotting stage')
+    parser.add_argument('--output', help='JSON file to write the results to')
+    parser.add_argument('--compare', help='earlier JSON results to compare against')
+    parser.add_argument('--trace', help='also record a stage trace to this JSON file')
+    parser.add_argument('--startup', action='store_true',
+                        help=f'only time cold starts, failing over {STARTUP_BUDGET_MS} ms')
+    args = parser.parse_args(argv)
+    if args.trace:
+        instrument.enable(args.trace)
+
+    if args.startup:
+        startup = startup_benchmark(repeat=args.repeat)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'startup': startup}, f, indent=2)
+        if any(result['over_budget'] for result in startup.values()):
+            sys.exit(1)
+        return startup
+
+    results = run_benchmark(int(args.packets), repeat=args.repeat, render=not args.no_render,
+                            loss=args.loss, burst_every=args.burst_every,
+                            burst_len=args.burst_len, switch_every=args.switch_every)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to '{args.output}'.")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Columnar cache for the link-test CSVs.
+
+The first load of a CSV parses it with the sniffing loader (small integer
+types, HH:MM:SS column already parsed) and stores the frame as Feather
+(or a pandas pickle if pyarrow isn't installed). Later loads read the
+binary file straight back. Cache files are keyed by the source path and
+its modification time, so editing or re-logging a CSV invalidates them.
+
+pandas and the loader are only imported once a frame is read or written,
+so modules that just need CACHE_DIR or cache_path() stay quick to import.
+"""
+import glob
+import hashlib
+import importlib.util
+import os
+from pathlib import Path
+
+from .instrument import count, stage
+
+# Feather needs pyarrow; looked up without importing it
+CACHE_SUFFIX = '.feather' if importlib.util.find_spec('pyarrow') else '.pkl'
+
+# Cache lives at the repo root unless LINKTEST_CACHE points somewhere else
+CACHE_DIR = Path(os.environ.get('LINKTEST_CACHE',
+                                Path(__file__).resolve().parents[1] / '.cache'))
+
+def _prefix(csv_path, kind=None):
+    """Part of the cache file name that stays the same across modifications."""
+    digest = hashlib.sha1(str(csv_path).encode()).hexdigest()[:12]
+    if kind:
+        return f"{csv_path.stem}.{kind}.{digest}"
+    return f"{csv_path.stem}.{digest}"
+
+
+def cache_path(csv_path, kind=None, suffix=CACHE_SUFFIX):
+    """Cache file for 'csv_path' (or a table derived from it) at its current modification time."""
+    csv_path = Path(csv_path).resolve()
+    mtime = csv_path.stat().st_mtime_ns
+    return CACHE_DIR / f"{_prefix(csv_path, kind)}.{mtime}{suffix}"
+
+
+def clear_stale(csv_path, kind=None, suffix=CACHE_SUFFIX):
+    """Removes every cache file of 'csv_path' (and 'kind'), ready for a fresh one."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    prefix = _prefix(Path(csv_path).resolve(), kind)
+    for old in CACHE_DIR.glob(f"{glob.escape(prefix)}.*{suffix}"):
+        old.unlink()
+
+
+def _read(path):
+    import pandas as pd
+
+    if CACHE_SUFFIX == '.feather':
+        return pd.read_feather(path)
+    return pd.read_pickle(path)
+
+
+def _write(df, path):
+    # Write next to the target and rename so a crash never leaves half a file
+    tmp = path.with_name(path.name + '.tmp')
+    if CACHE_SUFFIX == '.feather':
+        df.reset_index(drop=True).to_feather(tmp)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+
+
+def load_csv(csv_path, parse=None, kind=None):
+    """
+    Loads a CSV through the cache and returns the typed DataFrame.
+
+    - 'parse' is the function that turns the CSV path into a DataFrame on a
+      cache miss, read_dataset() by default
+    - 'kind' names a table derived from the CSV by 'parse' (window table,
+      summaries...) so it is cached alongside the parsed data, not over it
+    Stale cache files for the same CSV are removed when it is re-parsed.
+    """
+    from .loader import narrow_types, read_dataset
+
+    path = cache_path(csv_path, kind)
+    if path.exists():
+        try:
+            with stage('load cache', file=path.name) as timed:
+                df = _read(path)
+                timed.set_rows(len(df))
+            count('cache hits')
+            return df
+        except Exception as e:
+            print(f"Ignoring unreadable cache file {path.name}: {e}")
+
+    count('cache misses')
+    df = narrow_types((parse or read_dataset)(csv_path))
+
+    clear_stale(csv_path, kind)
+    _write(df, path)
+    return df
+
+
+def load_dir(directory, pattern='*.csv'):
+    """
+    Loads every CSV matching 'pattern' in 'directory' through the cache.
+    Returns a dict of path -> DataFrame in file name order; files that
+    can't be read are reported and left out.
+    """
+    frames = {}
+    for csv_path in sorted(Path(directory).glob(pattern)):
+        try:
+            frames[csv_path] = load_csv(csv_path)
+        except Exception as e:
+            print(f"Error loading {csv_path.name}: {e}")
+    return frames
@@ -0,0 +1,133 @@
+"""
+CAN log decoder and indexed frame store for the Live DTI motor tests.
+
+The logger writes space separated 'Timestamp ID Value1..4 Byte1..4' lines
+with the ID and the eight payload bytes in hex. read_can_log() parses a
+whole file with the pandas C parser and converts the hex with one int()
+call per distinct token, into a fixed-width structured array (uint32
+timestamp, uint16 ID, 8 x uint8 payload). CanLog sorts the frames by ID
+and time once and keeps an offset per ID, so "all 0x2214 frames between
+t0 and t1" is two binary searches and a slice instead of a scan.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .cache import cache_path, clear_stale
+
+FRAME_DTYPE = np.dtype([
+    ('timestamp', np.uint32),
+    ('id', np.uint16),
+    ('data', np.uint8, (8,)),
+])
+
+CAN_COLUMNS = ['Timestamp', 'ID', 'Value1', 'Value2', 'Value3', 'Value4',
+               'Byte1', 'Byte2', 'Byte3', 'Byte4']
+
+
+def _hex_values(tokens):
+    """Hex strings to ints (-1 where not valid hex), one int() per distinct token."""
+    codes, uniques = pd.factorize(tokens)
+    values = np.empty(len(uniques), dtype=np.int64)
+    for i, token in enumerate(uniques):
+        try:
+            values[i] = int(token, 16)
+        except ValueError:
+            values[i] = -1
+    return values[codes]
+
+
+def read_can_log(path):
+    """
+    Parses a CAN log into a FRAME_DTYPE array in file order.
+    Header rows, short lines and fields that aren't valid hex or don't fit
+    the ID / byte width are dropped and counted.
+    """
+    df = pd.read_csv(path, sep=r'\s+', header=None, names=CAN_COLUMNS, dtype=str,
+                     on_bad_lines='skip')
+    # Drop the header row(s) and lines cut short
+    df = df[df['Timestamp'] != 'Timestamp'].dropna()
+    timestamps = pd.to_numeric(df['Timestamp'], errors='coerce').to_numpy()
+
+    # All nine hex columns in one go, row-major so it reshapes straight back
+    hex_values = _hex_values(df[CAN_COLUMNS[1:]].to_numpy().ravel()).reshape(len(df), 9)
+    ids, payload = hex_values[:, 0], hex_values[:, 1:]
+
+    good = ((timestamps >= 0) & (timestamps <= np.iinfo(np.uint32).max)
+            & (ids >= 0) & (ids <= 0xFFFF)
+            & ((payload >= 0) & (payload <= 0xFF)).all(axis=1))
+    skipped = len(good) - int(good.sum())
+    if skipped:
+        print(f"Skipped {skipped} malformed lines in {path}")
+
+    frames = np.empty(int(good.sum()), dtype=FRAME_DTYPE)
+    frames['timestamp'] = timestamps[good]
+    frames['id'] = ids[good]
+    frames['data'] = payload[good]
+    return frames
+
+
+class CanLog:
+    """
+    Frames sorted by ID then timestamp, with the offset of each ID's block.
+
+    - 'ids' are the distinct IDs in ascending order, and frames[offsets[i]:
+      offsets[i + 1]] are all the frames of ids[i]
+    Frames with the same ID and timestamp keep their file order.
+    """
+
+    def __init__(self, frames, ids=None, offsets=None):
+        if ids is None or offsets is None:
+            frames = frames[np.lexsort((frames['timestamp'], frames['id']))]
+            ids, starts = np.unique(frames['id'], return_index=True)
+            offsets = np.r_[starts, len(frames)]
+        self.frames = frames
+        self.ids = ids
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frames_for(self, can_id, t0=None, t1=None):
+        """
+        Frames of 'can_id' with t0 <= timestamp <= t1 (either end open when
+        None), as a view into the store.
+        """
+        i = np.searchsorted(self.ids, can_id)
+        if i == len(self.ids) or self.ids[i] != can_id:
+            return self.frames[:0]
+        block = self.frames[self.offsets[i]:self.offsets[i + 1]]
+        times = block['timestamp']
+        lo = 0 if t0 is None else np.searchsorted(times, t0, side='left')
+        hi = len(block) if t1 is None else np.searchsorted(times, t1, side='right')
+        return block[lo:hi]
+
+    def save(self, path):
+        """Writes the store as an uncompressed .npz (frames, ids, offsets)."""
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, frames=self.frames, ids=self.ids, offsets=self.offsets)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as store:
+            return cls(store['frames'], store['ids'], store['offsets'])
+
+
+def load_can_log(path):
+    """
+    CanLog for a CAN log file, built once and then read back from the cache
+    (keyed on the file's modification time like the CSV cache).
+    """
+    store = cache_path(path, kind='can', suffix='.npz')
+    if store.exists():
+        try:
+            return CanLog.load(store)
+        except Exception as e:
+            print(f"Ignoring unreadable cache file {store.name}: {e}")
+
+    log = CanLog(read_can_log(path))
+    clear_stale(path, kind='can', suffix='.npz')
+    log.save(store)
+    return log
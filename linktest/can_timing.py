@@ -0,0 +1,84 @@
+"""
+Per-ID timing of the CAN frames that made it over the wireless bridge.
+
+The DTI logger prints the last frame of every ID on each pass, so one
+received frame shows up several times with the same timestamp; only the
+distinct timestamps of an ID are actual receptions. From those, with diffs
+over the whole ID at once:
+- period: median time between receptions (the inverter's cycle time)
+- jitter: how far each gap is from a whole number of periods
+- missed cycles: a gap of k periods means k - 1 frames never arrived
+- bursts: each gap with misses is one burst of consecutive lost frames
+"""
+import numpy as np
+import pandas as pd
+
+SUMMARY_COLUMNS = ['ID', 'frames', 'reprints', 'period_ms', 'jitter_p50', 'jitter_p95',
+                   'jitter_p99', 'missed', 'loss_pct', 'bursts', 'max_burst']
+
+
+def reception_times(frames):
+    """Distinct timestamps of one ID's frames (sorted, as CanLog keeps them)."""
+    times = frames['timestamp'].astype(np.int64)
+    if len(times) == 0:
+        return times
+    return times[np.r_[True, np.diff(times) != 0]]
+
+
+def gap_cycles(times, period=None):
+    """
+    Gaps between receptions in whole periods. Returns (gaps, cycles, period):
+    'cycles' is 1 for an on-time frame and k + 1 after k missed frames.
+    'period' defaults to the median gap.
+    """
+    gaps = np.diff(times)
+    if period is None:
+        period = float(np.median(gaps)) if len(gaps) else np.nan
+    if len(gaps) == 0 or not period > 0:
+        return gaps, np.ones(len(gaps), dtype=np.int64), period
+    cycles = np.maximum(np.rint(gaps / period).astype(np.int64), 1)
+    return gaps, cycles, period
+
+
+def id_timing(frames, period=None):
+    """Timing stats for one ID's frames as a dict (see SUMMARY_COLUMNS)."""
+    times = reception_times(frames)
+    gaps, cycles, period = gap_cycles(times, period)
+    missed = cycles - 1
+    bursts = missed[missed > 0]
+    jitter = np.abs(gaps - cycles * period) if len(gaps) else np.zeros(1)
+    p50, p95, p99 = np.percentile(jitter, [50, 95, 99])
+    expected = len(times) + int(missed.sum())
+    return {
+        'frames': len(times),
+        'reprints': len(frames) - len(times),
+        'period_ms': period,
+        'jitter_p50': p50,
+        'jitter_p95': p95,
+        'jitter_p99': p99,
+        'missed': int(missed.sum()),
+        'loss_pct': 100.0 * missed.sum() / expected if expected else 0.0,
+        'bursts': len(bursts),
+        'max_burst': int(bursts.max()) if len(bursts) else 0,
+    }
+
+
+def timing_summary(log, periods=None):
+    """
+    One row per CAN ID of a CanLog, IDs as '0x2014' strings.
+    'periods' can pin the nominal period of some IDs ({0x2014: 20, ...})
+    instead of taking the median gap.
+    """
+    periods = periods or {}
+    rows = []
+    for can_id in log.ids:
+        stats = id_timing(log.frames_for(can_id), periods.get(int(can_id)))
+        rows.append({'ID': f'0x{int(can_id):X}', **stats})
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+
+def burst_lengths(frames, period=None):
+    """Lengths of every run of consecutive missed frames for one ID."""
+    _, cycles, _ = gap_cycles(reception_times(frames), period)
+    missed = cycles - 1
+    return missed[missed > 0]
@@ -0,0 +1,187 @@
+"""
+Serial capture daemon for the receiving Teensy, replacing readserial.py.
+
+A reader thread pulls everything the port has buffered in one read call and
+pushes the chunk, stamped with the monotonic clock, into a ring buffer. The
+main thread splits the chunks into lines, prefixes each with the host
+HH:MM:SS time like readserial.py did, and writes them out in batches. The
+console only gets a status line every few seconds, so printing and per-line
+formatting can no longer hold up the port and show up as fake packet loss.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class RingBuffer:
+    """
+    Bounded chunk queue between the reader thread and the writer.
+    If the writer ever falls 'size' chunks behind, the oldest chunk is
+    dropped and counted rather than letting memory grow without limit.
+    """
+
+    def __init__(self, size=4096):
+        self.size = size
+        self.dropped = 0
+        self._chunks = deque()
+        self._ready = threading.Condition()
+
+    def put(self, item):
+        with self._ready:
+            if len(self._chunks) >= self.size:
+                self._chunks.popleft()
+                self.dropped += 1
+            self._chunks.append(item)
+            self._ready.notify()
+
+    def take_all(self, timeout):
+        """Waits up to 'timeout' seconds for data, then takes every queued chunk."""
+        with self._ready:
+            if not self._chunks:
+                self._ready.wait(timeout)
+            items = list(self._chunks)
+            self._chunks.clear()
+        return items
+
+
+class WallClock:
+    """
+    HH:MM:SS for monotonic timestamps. The wall clock is read once at start,
+    and the string is only re-formatted when the second changes.
+    """
+
+    def __init__(self):
+        self._mono0 = time.monotonic()
+        self._wall0 = time.time()
+        self._second = None
+        self._text = ''
+
+    def format(self, mono):
+        second = int(self._wall0 + (mono - self._mono0))
+        if second != self._second:
+            self._second = second
+            self._text = datetime.fromtimestamp(second).strftime('%H:%M:%S')
+        return self._text
+
+
+def _read_port(port, ring, stop, errors):
+    """Reader thread: whole chunks off the port into the ring buffer."""
+    try:
+        while not stop.is_set():
+            # Block for the first byte (up to the port timeout), then take the rest
+            data = port.read(1)
+            if not data:
+                continue
+            waiting = port.in_waiting
+            if waiting:
+                data += port.read(waiting)
+            ring.put((time.monotonic(), data))
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+
+
+def open_port(port, baudrate=115200, timeout=0.05):
+    """Opens the serial port the Teensy is on (COM8, /dev/ttyACM0, a pty...)."""
+    import serial
+    teensy = serial.Serial(port=port, baudrate=baudrate, timeout=timeout)
+    teensy.reset_input_buffer()
+    return teensy
+
+
+def capture(port, output, append=True, start_byte=b'x', stop_line='stop',
+            duration=None, status_interval=2.0, flush_interval=1.0,
+            ring_size=4096, on_lines=None, status=None):
+    """
+    Logs the Teensy's packet lines to 'output' until it sends 'stop_line',
+    'duration' seconds pass or Ctrl+C.
+
+    - 'port' is a port name for open_port() or an already open serial-like
+      object with read(), in_waiting, write() and close()
+    - lines are written as 'HH:MM:SS,<line>' in the layout readserial.py
+      produced, appended to 'output' unless 'append' is False
+    - 'on_lines', if given, is called with every batch of (HH:MM:SS, line)
+      pairs before they are written, for live monitoring
+    - 'status', if given, is called for extra text on the console status line
+    Returns a dict of counters: lines, bytes, dropped_chunks, seconds.
+    """
+    teensy = open_port(port) if isinstance(port, str) else port
+    ring = RingBuffer(ring_size)
+    clock = WallClock()
+    stop = threading.Event()
+    errors = []
+    reader = threading.Thread(target=_read_port, args=(teensy, ring, stop, errors),
+                              daemon=True)
+
+    stats = {'lines': 0, 'bytes': 0, 'dropped_chunks': 0, 'seconds': 0.0}
+    started = time.monotonic()
+    last_status = last_flush = started
+    last_line = ''
+    carry = ''
+    finished = False
+
+    logging = open(output, mode='a' if append else 'w', newline='', buffering=1 << 20)
+    try:
+        # Write a single character to start communication
+        if start_byte:
+            teensy.write(start_byte)
+        reader.start()
+
+        while not finished:
+            chunks = ring.take_all(timeout=0.1)
+            now = time.monotonic()
+            if not chunks and stop.is_set():
+                break
+
+            rows = []
+            for mono, data in chunks:
+                stats['bytes'] += len(data)
+                stamp = clock.format(mono)
+                lines = (carry + data.decode('utf-8', 'replace')).split('\n')
+                carry = lines.pop()  # unfinished line, completed by the next chunk
+                for line in lines:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    if line == stop_line:
+                        finished = True
+                        break
+                    rows.append((stamp, line))
+                if finished:
+                    break
+
+            if rows:
+                if on_lines is not None:
+                    on_lines(rows)
+                # One write per batch, csv.writer's \r\n line endings
+                logging.write(''.join(f"{stamp},{line}\r\n" for stamp, line in rows))
+                stats['lines'] += len(rows)
+                last_line = rows[-1][1]
+
+            if now - last_flush >= flush_interval:
+                logging.flush()
+                last_flush = now
+            if status_interval and now - last_status >= status_interval:
+                rate = stats['lines'] / max(now - started, 1e-9)
+                extra = f"  [{status()}]" if status is not None else ''
+                print(f"{clock.format(now)}  {stats['lines']} lines ({rate:.0f}/s), "
+                      f"last: {last_line}{extra}")
+                last_status = now
+            if duration is not None and now - started >= duration:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        if reader.is_alive():
+            reader.join(timeout=1.0)
+        logging.close()
+        teensy.close()
+
+    if errors:
+        print(f"Serial read failed: {errors[0]}")
+    stats['dropped_chunks'] = ring.dropped
+    stats['seconds'] = time.monotonic() - started
+    print(f"logging finished: {stats['lines']} lines in {stats['seconds']:.1f}s")
+    return stats
@@ -0,0 +1,289 @@
+"""
+SQLite catalog of every dataset in the repo.
+
+Test metadata otherwise only lives in file names ('250m2mbps.csv',
+'DRIVINGONEMBPS250kbps.csv') and the README, so finding "every 2 Mbps run
+at 200 m or more" meant globbing and re-reading files. update_catalog()
+indexes each CSV once - test day, distance and data rate from the path,
+power levels, rows, index range, duration and loss from the data, and a
+SHA-1 of the bytes - and keeps the rows in CATALOG_PATH:
+
+- files whose size and modification time haven't changed are skipped
+  without being opened; touched files with the same hash keep their row
+- new or edited files are read by a run_batch() pool, and rows of files
+  that have gone are dropped
+- 'graphs' folders and session indexes (the tools' own output) aren't
+  walked; any other CSV that isn't a dataset gets a row of kind 'other',
+  so it is hashed once rather than re-read on every run
+find_datasets() then answers queries from the database alone, without
+importing pandas, and returns paths ready for run_batch() or the command
+line ('python -m linktest find ... --paths | python -m linktest plot -').
+"""
+import hashlib
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+from .cache import CACHE_DIR
+from .layout import PACKED_SUFFIX, sniff_layout
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CATALOG_PATH = CACHE_DIR / 'catalog.sqlite'
+SCHEMA_VERSION = 1
+MAX_STEP_MS = 10000   # millis steps longer than this are pauses between runs, not logged time
+
+COLUMNS = [
+    ('path', 'TEXT PRIMARY KEY'),   # relative to the repo root when inside it
+    ('folder', 'TEXT'),
+    ('name', 'TEXT'),
+    ('day', 'TEXT'),                # YYYY-MM-DD from a DDMMYYYY folder
+    ('kind', 'TEXT'),               # raw, processed, can or other (not a dataset)
+    ('distance_m', 'INTEGER'),
+    ('rate', 'TEXT'),               # data rate(s) in the name: 250kbps, 1mbps, 2mbps
+    ('data_rates', 'TEXT'),         # DataRate values in the data, comma separated
+    ('power_levels', 'TEXT'),       # PowerLevel values in the data, comma separated
+    ('rows', 'INTEGER'),
+    ('received', 'INTEGER'),
+    ('index_min', 'INTEGER'),
+    ('index_max', 'INTEGER'),
+    ('start_time', 'TEXT'),         # first host HH:MM:SS
+    ('duration_s', 'REAL'),
+    ('loss_pct', 'REAL'),
+    ('size', 'INTEGER'),
+    ('mtime_ns', 'INTEGER'),
+    ('sha1', 'TEXT'),
+]
+NAMES = [name for name, _ in COLUMNS]
+
+RATE_PATTERN = re.compile(r'(250\s*k|one\s*m|two\s*m|[12]\s*m)(?:bps|pbs)', re.IGNORECASE)
+RATE_WORDS = {'250k': '250kbps', 'onem': '1mbps', 'twom': '2mbps', '1m': '1mbps', '2m': '2mbps'}
+
+
+def name_metadata(filename):
+    """
+    Distance and data rate(s) from a file name, as {'distance_m', 'rate'}:
+    '150m1mpbsnew.csv' -> 150, '1mbps'. Either is None when the name
+    doesn't say; names with several rates give them comma separated.
+    """
+    match = re.match(r'(\d+)m', filename)
+    rates = [RATE_WORDS[re.sub(r'\s', '', found.lower())] for found in RATE_PATTERN.findall(filename)]
+    return {'distance_m': int(match.group(1)) if match else None,
+            'rate': ','.join(dict.fromkeys(rates)) or None}
+
+
+def _day(path):
+    """YYYY-MM-DD of the innermost DDMMYYYY folder 'path' is in, or None."""
+    for part in reversed(Path(path).parent.parts):
+        if re.fullmatch(r'\d{8}', part):
+            return f"{part[4:]}-{part[2:4]}-{part[:2]}"
+    return None
+
+
+def _key(path):
+    """Catalog key: repo-relative POSIX path, absolute for files outside the repo."""
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(REPO_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def file_hash(path):
+    """SHA-1 of the file's bytes, read a megabyte at a time."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _values(series):
+    """Distinct non-blank values of an integer column, comma separated."""
+    return ','.join(str(int(v)) for v in sorted(series.dropna().unique()))
+
+
+def describe_file(path):
+    """
+    Catalog row (a dict of NAMES) for one CSV. The data columns stay None
+    when a layout doesn't have them (no DataRate in 13022025 logs, no
+    packet index in CAN logs).
+    """
+    import numpy as np
+    import pandas as pd
+
+    from .loader import read_dataset
+    from .metrics import standard_columns
+
+    path = Path(path)
+    stat = path.stat()
+    row = dict.fromkeys(NAMES)
+    row.update(name_metadata(path.name))
+    row.update(path=_key(path), folder=Path(_key(path)).parent.as_posix(), name=path.name,
+               day=_day(_key(path)), size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+               sha1=file_hash(path))
+
+    try:
+        row['kind'] = sniff_layout(path)[0]
+    except ValueError:
+        # A CSV the tools wrote (a summary table) or something else again
+        row['kind'] = 'other'
+        return row
+    df = standard_columns(read_dataset(path, parse_times=False))
+    row['rows'] = len(df)
+    if row['kind'] == 'can' or len(df) == 0:
+        return row
+
+    if 'DataRate' in df:
+        row['data_rates'] = _values(df['DataRate'])
+        row['power_levels'] = _values(df['PowerLevel'])
+    if 'Timestamp' in df and not pd.api.types.is_numeric_dtype(df['Timestamp']):
+        times = df['Timestamp'].dropna()
+        row['start_time'] = str(times.iloc[0]) if len(times) else None
+
+    # 13022025 processed files call the Teensy clock Timestamp
+    millis_column = 'Millis' if 'Millis' in df else 'Timestamp'
+    if 'Indicator' in df:
+        received = df[df['Indicator'] == 1]
+    else:
+        received = df
+    index = received['Index'].to_numpy(dtype=np.int64)
+    millis = df[millis_column].to_numpy(dtype=np.float64, na_value=np.nan)
+    millis = millis[~np.isnan(millis)]
+    if len(index):
+        row['index_min'], row['index_max'] = int(index.min()), int(index.max())
+        # Expected packets as the gap-filler sees them: every index step
+        # forward, plus one for the first packet of each run after a reset
+        steps = np.diff(index)
+        expected = 1 + int(steps[steps > 0].sum()) + int((steps < 0).sum())
+        row['received'] = len(index) - int((steps == 0).sum())
+        row['loss_pct'] = 100 * (1 - row['received'] / expected)
+    if len(millis):
+        steps = np.diff(millis)
+        row['duration_s'] = float(steps[(steps > 0) & (steps <= MAX_STEP_MS)].sum()) / 1000
+    return row
+
+
+def connect(db_path=None):
+    """Opens the catalog, creating it (or recreating it after a schema change) as needed."""
+    db_path = Path(db_path) if db_path is not None else CATALOG_PATH
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(db_path)
+    db.row_factory = sqlite3.Row
+    if db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        db.execute('DROP TABLE IF EXISTS datasets')
+        db.execute(f"CREATE TABLE datasets ({', '.join(f'{n} {t}' for n, t in COLUMNS)})")
+        for column in ('day', 'distance_m', 'rate', 'kind', 'sha1'):
+            db.execute(f'CREATE INDEX datasets_{column} ON datasets ({column})')
+        db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        db.commit()
+    return db
+
+
+def _csv_files(roots):
+    """
+    Every *.csv and packed dataset under 'roots' (files are kept as given),
+    leaving out hidden folders, the cache, 'graphs' folders and
+    '<stem>_sessions.csv' indexes.
+    """
+    cache_dir = CACHE_DIR.resolve()
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            yield root
+            continue
+        for folder, subfolders, files in os.walk(root):
+            subfolders[:] = sorted(d for d in subfolders
+                                   if not d.startswith('.') and d != 'graphs'
+                                   and (Path(folder) / d).resolve() != cache_dir)
+            for name in sorted(files):
+                if name.lower().endswith('_sessions.csv'):
+                    continue
+                if name.lower().endswith(('.csv', PACKED_SUFFIX)):
+                    yield Path(folder) / name
+
+
+def update_catalog(roots=None, db_path=None, workers=None):
+    """
+    Brings the catalog up to date with the CSVs under 'roots' (the whole
+    repo by default). Returns counts as {'added', 'updated', 'unchanged',
+    'removed', 'failed'}.
+    """
+    from .batch import run_batch
+
+    roots = [Path(root) for root in roots] if roots else [REPO_ROOT]
+    db = connect(db_path)
+    known = {row['path']: row for row in db.execute('SELECT path, size, mtime_ns, sha1 FROM datasets')}
+    counts = dict.fromkeys(('added', 'updated', 'unchanged', 'removed', 'failed'), 0)
+
+    seen, changed = set(), []
+    for path in _csv_files(roots):
+        key = _key(path)
+        seen.add(key)
+        stat = path.stat()
+        old = known.get(key)
+        if old is not None and (old['size'], old['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            counts['unchanged'] += 1
+        elif old is not None and old['sha1'] == file_hash(path):
+            # Touched or copied over with the same bytes
+            db.execute('UPDATE datasets SET mtime_ns = ?, size = ? WHERE path = ?',
+                       (stat.st_mtime_ns, stat.st_size, key))
+            counts['unchanged'] += 1
+        else:
+            changed.append(path)
+
+    if changed:
+        results, failures = run_batch(describe_file, changed, workers)
+        counts['failed'] = len(failures)
+        for path, row in results:
+            counts['updated' if row['path'] in known else 'added'] += 1
+            db.execute(f"INSERT OR REPLACE INTO datasets ({', '.join(NAMES)}) "
+                       f"VALUES ({', '.join('?' * len(NAMES))})", [row[n] for n in NAMES])
+
+    # Rows of files under the scanned folders that aren't there any more
+    for key in known:
+        path = Path(key) if Path(key).is_absolute() else REPO_ROOT / key
+        inside = any(path == root.resolve() or root.resolve() in path.parents for root in roots)
+        if inside and key not in seen:
+            db.execute('DELETE FROM datasets WHERE path = ?', (key,))
+            counts['removed'] += 1
+    db.commit()
+    db.close()
+    return counts
+
+
+def find_datasets(db_path=None, kind=None, rate=None, day=None, min_distance=None,
+                  max_distance=None, power_level=None, name=None, max_loss=None):
+    """
+    Catalog rows (dicts of NAMES plus 'file', the absolute Path) matching
+    every filter given, in path order. Files of kind 'other' are only
+    returned when asked for by 'kind':
+
+    - 'rate' is '250kbps', '1mbps' or '2mbps' as in the file names
+    - 'day' is YYYY-MM-DD or a prefix of it ('2025-03')
+    - 'power_level' matches files with that PowerLevel anywhere in them
+    - 'name' is a SQL LIKE pattern on the file name ('%walking%')
+    """
+    where, params = ([], []) if kind is not None else (["kind != 'other'"], [])
+    for clause, value in (('kind = ?', kind),
+                          ("',' || rate || ',' LIKE '%,' || ? || ',%'", rate),
+                          ("day LIKE ? || '%'", day),
+                          ('distance_m >= ?', min_distance),
+                          ('distance_m <= ?', max_distance),
+                          ("',' || power_levels || ',' LIKE '%,' || ? || ',%'", power_level),
+                          ('name LIKE ?', name),
+                          ('loss_pct <= ?', max_loss)):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+    query = 'SELECT * FROM datasets'
+    if where:
+        query += ' WHERE ' + ' AND '.join(where)
+    query += ' ORDER BY path'
+
+    db = connect(db_path)
+    rows = [dict(row) for row in db.execute(query, params)]
+    db.close()
+    for row in rows:
+        row['file'] = Path(row['path']) if Path(row['path']).is_absolute() else REPO_ROOT / row['path']
+    return rows
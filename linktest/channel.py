@@ -0,0 +1,229 @@
+"""
+Burst loss: runs of lost and received packets, and a Gilbert-Elliott fit.
+
+Success rate and packets per second say how many packets got through, not
+how the losses were spread; for CAN over the link ten single losses and one
+gap of ten frames are very different. The gap-filled Indicator column
+already has the answer, one row per expected packet, so:
+
+- run_lengths() run-length encodes it with array ops (change points from
+  a diff, lengths from their spacing), no Python loop over packets
+- ChannelStats takes the Indicator of a window a chunk at a time, carrying
+  the open run and the last two packets across chunks, and keeps sparse
+  histograms of loss-run and good-run lengths plus the loss counts the
+  channel fit needs; memory stays at the chunk size whatever the length
+- the fit is the Gilbert form of the Gilbert-Elliott model: a good state
+  that loses nothing and a bad state that loses a packet with probability
+  1 - h, moving G->B with probability p and B->G with r per packet. The
+  three parameters come from three moments of the loss stream (loss rate,
+  loss after a loss, loss two packets after a loss), which have a closed
+  form solution; where the stream is too close to random loss to pin h
+  down it falls back to h = 0, the simple Gilbert model (r is one over the
+  mean loss run)
+window_channel() runs this over the stable windows of a processed file.
+"""
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 10000000
+
+SUMMARY_COLUMNS = ['Config', 'start_millis', 'end_millis', 'packets', 'lost', 'loss_pct',
+                   'loss_runs', 'mean_loss_run', 'p95_loss_run', 'max_loss_run',
+                   'mean_good_run', 'p', 'r', 'h', 'mean_bad_run']
+
+
+def run_lengths(values):
+    """
+    Run-length encoding of a 1-D array: (value of each run, its length),
+    e.g. [1, 1, 0, 0, 0, 1] -> ([1, 0, 1], [2, 3, 1]).
+    """
+    values = np.asarray(values)
+    if len(values) == 0:
+        return values[:0], np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    return values[starts], np.diff(np.r_[starts, len(values)])
+
+
+def _merge(histogram, lengths):
+    """Adds run 'lengths' to a sparse (lengths, counts) histogram."""
+    if len(lengths) == 0:
+        return histogram
+    new_lengths, new_counts = np.unique(lengths, return_counts=True)
+    old_lengths, old_counts = histogram
+    merged, inverse = np.unique(np.r_[old_lengths, new_lengths], return_inverse=True)
+    counts = np.bincount(inverse, weights=np.r_[old_counts, new_counts]).astype(np.int64)
+    return merged, counts
+
+
+def _percentile(histogram, q):
+    """Run length at percentile 'q' of a sparse histogram (NaN when empty)."""
+    lengths, counts = histogram
+    if counts.sum() == 0:
+        return np.nan
+    cumulative = np.cumsum(counts)
+    return float(lengths[np.searchsorted(cumulative, q / 100 * cumulative[-1])])
+
+
+def gilbert_fit(a, b, s):
+    """
+    Gilbert model parameters {p, r, h} from the loss rate 'a', the chance
+    'b' of a loss right after a loss and the chance 's' of a loss two
+    packets after one. With d = 1 - h the model gives a = d p / (p + r),
+    b = d (1 - r) and s = d ((1 - r)^2 + r p), so
+    d = (2ab - as - b^2) / (a - s), r = 1 - b / d, p = a r / (d - a).
+    """
+    if not a > 0:
+        return {'p': 0.0 if a == 0 else np.nan, 'r': np.nan, 'h': np.nan}
+    a, b, s = np.float64(a), np.float64(b), np.float64(s)  # NaN rather than ZeroDivisionError
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d = (2 * a * b - a * s - b * b) / (a - s)
+        d = min(d, 1.0)
+        r = 1 - b / d
+        p = a * r / (d - a)
+    if not (np.isfinite(p) and 0 <= p <= 1 and 1e-9 < r <= 1 and d > a):
+        # Too close to independent losses for h to be told apart, or r
+        # lost in rounding: assume the bad state loses everything
+        d = 1.0
+        r = 1 - b
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = a * r / (1 - a) if a < 1 else np.nan
+    return {'p': float(p), 'r': float(r), 'h': float(1 - d)}
+
+
+class ChannelStats:
+    """
+    Loss-run and good-run histograms and Gilbert moments of one packet
+    stream. Feed update() Indicator values (1 received, 0 lost) in order,
+    in as many chunks as convenient; histograms(), fit() and summary() can
+    be asked at any point.
+    """
+
+    def __init__(self):
+        self.packets = 0
+        self.lost = 0
+        self._pairs = 0        # lost packets followed by a lost packet
+        self._skips = 0        # lost packets with a lost packet two later
+        self._tail = np.zeros(0, dtype=bool)   # last two packets seen
+        self._open = None      # (lost, length) of the run still going
+        self._loss = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self._good = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    def update(self, indicator):
+        lost = np.asarray(indicator) == 0
+        if len(lost) == 0:
+            return
+        self.packets += len(lost)
+        self.lost += int(np.count_nonzero(lost))
+
+        # Lag-1 and lag-2 loss pairs ending in this chunk
+        joined = np.r_[self._tail, lost]
+        held = len(self._tail)
+        first = max(held, 1)
+        self._pairs += int(np.count_nonzero(joined[first:] & joined[first - 1:-1]))
+        first = max(held, 2)
+        self._skips += int(np.count_nonzero(joined[first:] & joined[first - 2:-2]))
+        self._tail = joined[-2:]
+
+        values, lengths = run_lengths(lost)
+        if self._open is not None:
+            if values[0] == self._open[0]:
+                lengths[0] += self._open[1]
+            else:
+                values, lengths = np.r_[self._open[0], values], np.r_[self._open[1], lengths]
+        # The last run may go on in the next chunk
+        self._open = (bool(values[-1]), int(lengths[-1]))
+        values, lengths = values[:-1], lengths[:-1]
+        self._loss = _merge(self._loss, lengths[values])
+        self._good = _merge(self._good, lengths[~values])
+
+    def histograms(self):
+        """Sparse ((lengths, counts) of loss runs, (lengths, counts) of good runs), open run included."""
+        loss, good = self._loss, self._good
+        if self._open is not None:
+            run = np.array([self._open[1]])
+            if self._open[0]:
+                loss = _merge(loss, run)
+            else:
+                good = _merge(good, run)
+        return loss, good
+
+    def fit(self):
+        """gilbert_fit() of the stream so far, as {p, r, h}."""
+        if self.packets == 0:
+            return {'p': np.nan, 'r': np.nan, 'h': np.nan}
+        # Lost packets with one (two) more packets after them to compare with
+        tail = self._tail
+        with_next = self.lost - int(tail[-1])
+        with_second = self.lost - int(np.count_nonzero(tail[-2:])) if len(tail) == 2 else 0
+        a = self.lost / self.packets
+        b = self._pairs / with_next if with_next else np.nan
+        s = self._skips / with_second if with_second else np.nan
+        return gilbert_fit(a, b, s)
+
+    def summary(self):
+        """SUMMARY_COLUMNS values from 'packets' on, as a dict."""
+        loss, good = self.histograms()
+        loss_runs = int(loss[1].sum())
+        good_runs = int(good[1].sum())
+        fit = self.fit()
+        return {
+            'packets': self.packets,
+            'lost': self.lost,
+            'loss_pct': 100 * self.lost / self.packets if self.packets else np.nan,
+            'loss_runs': loss_runs,
+            'mean_loss_run': self.lost / loss_runs if loss_runs else np.nan,
+            'p95_loss_run': _percentile(loss, 95),
+            'max_loss_run': int(loss[0][-1]) if loss_runs else 0,
+            'mean_good_run': (self.packets - self.lost) / good_runs if good_runs else np.nan,
+            **fit,
+            'mean_bad_run': 1 / fit['r'] if fit['r'] > 0 else np.nan,
+        }
+
+
+def stream_channel(indicator, chunk_rows=CHUNK_ROWS):
+    """ChannelStats of a whole Indicator array, fed 'chunk_rows' at a time."""
+    stats = ChannelStats()
+    indicator = np.asarray(indicator)
+    for start in range(0, len(indicator), chunk_rows):
+        stats.update(indicator[start:start + chunk_rows])
+    return stats
+
+
+def window_channel(df, windows):
+    """
+    ChannelStats for each window of a processed dataset, as a list of
+    (config, start_millis, end_millis, stats). 'windows' is a table like
+    stable_windows() returns (Config, start_millis, end_millis); only rows
+    of the window's own config count, in file order.
+    """
+    from .metrics import config_codes
+
+    codes, labels = config_codes(df)
+    millis = df['Millis'].to_numpy(dtype=np.float64, na_value=np.nan)
+    indicator = df['Indicator'].to_numpy(dtype=np.int8, na_value=0)
+    results = []
+    for window in windows.itertuples(index=False):
+        if window.Config not in labels:
+            continue
+        rows = ((codes == labels.index(window.Config)) &
+                (millis >= window.start_millis) & (millis <= window.end_millis))
+        results.append((window.Config, window.start_millis, window.end_millis,
+                        stream_channel(indicator[rows])))
+    return results
+
+
+def channel_summary(results):
+    """SUMMARY_COLUMNS table for window_channel() results."""
+    rows = [{'Config': config, 'start_millis': start, 'end_millis': end, **stats.summary()}
+            for config, start, end, stats in results]
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+
+def run_table(stats):
+    """Long table of run-length histograms: columns run ('loss'/'good'), length, runs."""
+    loss, good = stats.histograms()
+    return pd.DataFrame({
+        'run': ['loss'] * len(loss[0]) + ['good'] * len(good[0]),
+        'length': np.r_[loss[0], good[0]],
+        'runs': np.r_[loss[1], good[1]],
+    })
@@ -0,0 +1,552 @@
+"""
+Command line for the whole pipeline, so a new test day needs no source edits:
+
+    python -m linktest capture COM8 antenna.csv
+    python -m linktest fill "19032025/csv/*.csv"
+    python -m linktest metrics 19032025/testing/csvnew -o summary.csv
+    python -m linktest plot 19032025/testing/csvnew
+    python -m linktest distance 19032025/testing/csvnew
+    python -m linktest can "Live DTI"
+    python -m linktest clock 19032025/csv -o clock.csv
+    python -m linktest dashboard "Week 9 combined/24032025" "Live DTI"
+    python -m linktest index
+    python -m linktest find --rate 2mbps --min-distance 200 --paths | python -m linktest plot -
+    python -m linktest pack 19032025/testing/csvnew
+
+Inputs are files, folders (every *.csv in them, and packed .rle files
+without a CSV next to them), glob patterns or '-' for
+a list of paths on stdin (find --paths), and any number of them can be
+given, so pandas and matplotlib are imported once per run rather than once
+per file per script. Files of the wrong kind for a
+command (processed files given to fill, raw ones to plot...) are skipped,
+which lets a whole folder be passed as is. Work per file is spread over
+run_batch()'s process pool; --workers sets its size and --trace records a
+stage trace (linktest.instrument). Each command imports what it needs when
+it runs, so 'capture' doesn't wait for pandas.
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+from functools import partial
+from pathlib import Path
+
+from . import instrument
+from .layout import PACKED_SUFFIX, RAW_COLUMNS, sniff_layout
+
+
+def expand_inputs(inputs, pattern='*.csv'):
+    """
+    Paths for a list of command-line inputs: folders give every file
+    matching 'pattern' in them, glob patterns are expanded (** included),
+    '-' reads one path per line from stdin and plain files are kept.
+    Missing inputs are reported and left out; the result is in argument
+    order without repeats.
+    """
+    paths = []
+    if '-' in inputs:
+        at = inputs.index('-')
+        piped = [line.strip() for line in sys.stdin if line.strip()]
+        inputs = inputs[:at] + piped + inputs[at + 1:]
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            found = list(path.glob(pattern))
+            if pattern == '*.csv':
+                # Packed datasets stand in for CSVs that were packed and removed
+                found += [packed for packed in path.glob('*' + PACKED_SUFFIX)
+                          if not packed.with_suffix('.csv').exists()]
+            paths.extend(sorted(found))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+            if not matches:
+                print(f"No files match '{item}'")
+            paths.extend(Path(match) for match in matches if Path(match).is_file())
+        elif path.is_file():
+            paths.append(path)
+        else:
+            print(f"No such file or folder: '{item}'")
+    return list(dict.fromkeys(paths))
+
+
+def _with_layout(paths, layout, description):
+    """The paths whose sniffed layout is 'layout', reporting how many were skipped."""
+    kept = []
+    for path in paths:
+        try:
+            if sniff_layout(path)[0] == layout:
+                kept.append(path)
+        except (OSError, ValueError, UnicodeDecodeError):
+            pass
+    if len(kept) < len(paths):
+        print(f"Skipped {len(paths) - len(kept)} file(s) that aren't {description}.")
+    return kept
+
+
+def _graphs_dir(path, graphs_dir):
+    """'graphs_dir', or the usual 'graphs' folder next to the file; created if needed."""
+    graphs_dir = Path(graphs_dir) if graphs_dir is not None else Path(path).parent / 'graphs'
+    graphs_dir.mkdir(parents=True, exist_ok=True)
+    return graphs_dir
+
+
+def _headless(show):
+    """Saves figures without opening windows unless --show, in workers too."""
+    from . import render
+
+    if not show:
+        os.environ['LINKTEST_HEADLESS'] = '1'  # for spawned workers
+        render.use_headless()
+    return render.HEADLESS
+
+
+def _fill_one(path, out_dir=None):
+    from .fill import default_output, fill_file
+
+    output = default_output(path)
+    if out_dir is not None:
+        output = Path(out_dir) / output.name
+    return fill_file(path, output)
+
+
+def _fill_sessions(path, out_dir=None):
+    """test.py's way: split into sessions, fill each and keep the longest as '<name>new.csv'."""
+    from .fill import default_output, fill_file
+    from .sessions import split_sessions
+
+    base = Path(out_dir) if out_dir is not None else path.parent
+    session_dir = base / f"{path.stem}_sessions"
+    sessions = split_sessions(path, session_dir)
+    if sessions.empty:
+        return None, 0, 0
+    filled = [fill_file(session_dir / name) for name in sessions['file']]
+    output, rows, received = filled[sessions['rows'].idxmax()]
+    final = base / default_output(path).name
+    shutil.copyfile(output, final)
+    return final, rows, received
+
+
+def cmd_capture(args):
+    from .capture import capture
+    from .live import LiveMetrics, serve_metrics
+
+    live = LiveMetrics()
+    server = serve_metrics(live, args.metrics_port) if args.metrics_port else None
+    try:
+        stats = capture(args.port, args.output, append=not args.new,
+                        duration=args.duration, on_lines=live.feed, status=live.status_line)
+    finally:
+        if server is not None:
+            server.shutdown()
+    print(f"Logged {stats['lines']} lines to '{args.output}' in {stats['seconds']:.1f} s.")
+    return 0
+
+
+def cmd_fill(args):
+    paths = _with_layout(expand_inputs(args.inputs), 'raw', 'raw captures')
+    if not paths:
+        print("Nothing to fill.")
+        return 1
+    if args.out_dir is not None:
+        Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+
+    if args.stream:
+        from .fill import default_output
+        from .incremental import update_fill
+
+        failures = 0
+        for path in paths:
+            if sniff_layout(path)[1] != RAW_COLUMNS[5]:
+                print(f"Skipping {path.name}: --stream only reads the "
+                      f"HH:MM:SS,millis,index,datarate,powerlevel layout.")
+                continue
+            output = default_output(path)
+            if args.out_dir is not None:
+                output = Path(args.out_dir) / output.name
+            try:
+                state = update_fill(path, output)
+            except Exception as e:
+                print(f"Error processing {path.name}: {type(e).__name__}: {e}")
+                failures += 1
+                continue
+            totals = state['totals']
+            print(f"{path.name}: added {state['new_rows']} rows to '{output}' "
+                  f"({totals['rows']} in total, {totals['received']} received).")
+            if state['sessions']:
+                print(f"{path.name}: {state['sessions']} new session(s), each filled from "
+                      f"index 1 again.")
+            if state['rejected'] or state['late']:
+                print(f"{path.name}: left out {state['rejected']} packet(s) with a corrupt index "
+                      f"and {state['late']} that arrived after their slot was written.")
+        return 1 if failures else 0
+
+    from .batch import run_batch
+
+    job = _fill_sessions if args.sessions else _fill_one
+    results, failures = run_batch(partial(job, out_dir=args.out_dir), paths, args.workers)
+    for path, (output, rows, received) in results:
+        if output is None:
+            print(f"{path.name}: no data.")
+        else:
+            print(f"{path.name} -> '{output}': {rows} rows, {received} received "
+                  f"({100 * received / max(rows, 1):.1f}%)")
+    return 1 if failures else 0
+
+
+def _file_summary(path, bin_size=100):
+    from .cache import load_csv
+    from .metrics import config_summary, standard_columns
+
+    return config_summary(standard_columns(load_csv(path)), bin_size=bin_size)
+
+
+def cmd_metrics(args):
+    import pandas as pd
+
+    from .batch import run_batch
+
+    paths = _with_layout(expand_inputs(args.inputs), 'processed', 'processed (...new.csv) files')
+    if not paths:
+        print("No processed files to summarise.")
+        return 1
+    if args.bin_ms <= 0:
+        print("--bin-ms has to be a positive number of milliseconds.")
+        return 1
+    results, failures = run_batch(partial(_file_summary, bin_size=args.bin_ms), paths,
+                                  args.workers)
+    if not results:
+        return 1
+
+    tables = []
+    for path, summary in results:
+        summary.insert(0, 'file', path.name)
+        tables.append(summary)
+    table = pd.concat(tables, ignore_index=True)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"Summary saved to '{args.output}'.")
+    return 1 if failures else 0
+
+
+def _plot_one(path, graphs_dir=None, bin_size=100):
+    from .plots import config_graphs
+
+    config_graphs(path, _graphs_dir(path, graphs_dir), bin_size=bin_size)
+
+
+def cmd_plot(args):
+    from .batch import run_batch
+
+    paths = _with_layout(expand_inputs(args.inputs), 'processed', 'processed (...new.csv) files')
+    if not paths:
+        print("No processed files to plot.")
+        return 1
+    # Interactive runs go one file at a time since every figure waits on its window
+    workers = args.workers if _headless(args.show) else 1
+    if args.bin_ms <= 0 or args.bin_ms % 10:
+        print("--bin-ms has to be a positive multiple of 10.")
+        return 1
+    results, failures = run_batch(partial(_plot_one, graphs_dir=args.graphs_dir,
+                                          bin_size=args.bin_ms), paths, workers)
+    print(f"Plotted {len(results)} of {len(paths)} files.")
+    return 1 if failures else 0
+
+
+def cmd_distance(args):
+    from .distance import channel_by_distance, pps_by_distance
+    from .plots import distance_figure
+
+    paths = _with_layout(expand_inputs(args.inputs), 'processed', 'processed (...new.csv) files')
+    if not paths:
+        print("No processed files with a distance in the name.")
+        return 1
+    _headless(args.show)
+    results = pps_by_distance(paths, workers=args.workers)
+    if not results:
+        print("No processed files with a distance in the name.")
+        return 1
+    graphs_dir = _graphs_dir(paths[0], args.graphs_dir)
+    distance_figure(results, graphs_dir / "distance_comparison.png")
+
+    print("\nDetailed Results:")
+    for config, data in sorted(results.items()):
+        print(f"\n{config}:")
+        for d, p in zip(data['distances'], data['pps']):
+            print(f"  {d}m: {p:.2f} packets/second")
+
+    # How the losses in the same windows were spread
+    summary, runs = channel_by_distance(paths, workers=args.workers)
+    if summary is not None:
+        summary.to_csv(graphs_dir / "distance_channel.csv", index=False)
+        runs.to_csv(graphs_dir / "distance_runs.csv", index=False)
+        print("\nLoss bursts (runs in packets; Gilbert model p = G->B, r = B->G, "
+              "h = received in B):")
+        print(summary[['Config', 'distance', 'loss_pct', 'loss_runs', 'mean_loss_run',
+                       'p95_loss_run', 'max_loss_run', 'mean_good_run', 'p', 'r', 'h']]
+              .to_string(index=False, float_format=lambda v: f"{v:.3g}"))
+        print(f"\nBurst tables saved to '{graphs_dir}'.")
+    return 0
+
+
+def cmd_can(args):
+    from .can import load_can_log
+    from .can_timing import timing_summary
+    from .plots import can_timing_figure
+
+    paths = _with_layout(expand_inputs(args.inputs), 'can', 'CAN logs')
+    if not paths:
+        print("No CAN logs found.")
+        return 1
+    if not args.no_plot:
+        _headless(args.show)
+    for path in paths:
+        print(f"\nProcessing {path.name}...")
+        log = load_can_log(path)
+        if len(log) == 0:
+            print(f"No frames in {path.name}")
+            continue
+        summary = timing_summary(log)
+        print(summary.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+        graphs_dir = _graphs_dir(path, args.graphs_dir)
+        summary.to_csv(graphs_dir / f"{path.stem}_can_timing.csv", index=False)
+        if not args.no_plot:
+            can_timing_figure(log, path.stem, graphs_dir)
+    return 0
+
+
+def _file_clock(path):
+    from .clock import clock_summary, estimate_clock
+
+    return clock_summary(estimate_clock(path))
+
+
+def cmd_clock(args):
+    import pandas as pd
+
+    from .batch import run_batch
+    from .clock import clock_columns
+
+    inputs = expand_inputs(args.inputs)
+    paths = []
+    for path in inputs:
+        try:
+            if clock_columns(path) is not None:
+                paths.append(path)
+        except (OSError, ValueError, UnicodeDecodeError):
+            pass
+    if len(paths) < len(inputs):
+        print(f"Skipped {len(inputs) - len(paths)} file(s) without host times.")
+    if not paths:
+        print("No captures with host times to fit.")
+        return 1
+    results, failures = run_batch(_file_clock, paths, args.workers)
+    if not results:
+        return 1
+
+    tables = []
+    for path, summary in results:
+        summary.insert(0, 'file', path.name)
+        tables.append(summary)
+    table = pd.concat(tables, ignore_index=True)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"Clock fits saved to '{args.output}'.")
+    return 1 if failures else 0
+
+
+def cmd_dashboard(args):
+    from .dashboard import serve_dashboard
+
+    paths = expand_inputs(args.inputs)
+    kept = []
+    for path in paths:
+        try:
+            if sniff_layout(path)[0] in ('processed', 'can'):
+                kept.append(path)
+        except (OSError, ValueError, UnicodeDecodeError):
+            pass
+    if len(kept) < len(paths):
+        print(f"Skipped {len(paths) - len(kept)} file(s) that aren't processed files or CAN logs.")
+    if not kept:
+        print("Nothing to show.")
+        return 1
+    return serve_dashboard(kept, port=args.port, host=args.host, open_browser=not args.no_browser)
+
+
+def cmd_index(args):
+    from .catalog import update_catalog
+
+    counts = update_catalog(args.roots or None, workers=args.workers)
+    print(', '.join(f"{count} {what}" for what, count in counts.items()))
+    return 1 if counts['failed'] else 0
+
+
+def cmd_find(args):
+    from .catalog import find_datasets
+
+    rows = find_datasets(kind=args.kind, rate=args.rate, day=args.day,
+                         min_distance=args.min_distance, max_distance=args.max_distance,
+                         power_level=args.power_level, name=args.name, max_loss=args.max_loss)
+    if args.paths:
+        for row in rows:
+            print(row['file'])
+        return 0 if rows else 1
+
+    print(f"{'path':<52} {'day':<10} {'kind':<9} {'dist':>5} {'rate':<8} {'PL':<8} "
+          f"{'rows':>7} {'dur_s':>7} {'loss%':>6}")
+    for row in rows:
+        cells = [row['path'], row['day'] or '', row['kind'] or '',
+                 '' if row['distance_m'] is None else row['distance_m'], row['rate'] or '',
+                 row['power_levels'] or '', row['rows'],
+                 '' if row['duration_s'] is None else f"{row['duration_s']:.1f}",
+                 '' if row['loss_pct'] is None else f"{row['loss_pct']:.1f}"]
+        print(f"{cells[0]:<52} {cells[1]:<10} {cells[2]:<9} {cells[3]:>5} {cells[4]:<8} "
+              f"{cells[5]:<8} {cells[6]:>7} {cells[7]:>7} {cells[8]:>6}")
+    print(f"{len(rows)} dataset(s).")
+    return 0 if rows else 1
+
+
+def _pack_one(path, out_dir=None, unpack=False):
+    from .packed import default_packed, pack_csv, unpack_csv
+
+    if unpack:
+        output = None if out_dir is None else Path(out_dir) / path.with_suffix('.csv').name
+        output = unpack_csv(path, output)
+        return output, path.stat().st_size, output.stat().st_size
+    output = None if out_dir is None else Path(out_dir) / default_packed(path).name
+    return pack_csv(path, output)
+
+
+def cmd_pack(args):
+    from .batch import run_batch
+
+    paths = _with_layout(expand_inputs(args.inputs), 'processed', 'processed (...new.csv) files')
+    # Only the packed files when unpacking, only CSVs when packing
+    paths = [path for path in paths if str(path).endswith(PACKED_SUFFIX) == args.unpack]
+    if not paths:
+        print("Nothing to unpack." if args.unpack else "Nothing to pack.")
+        return 1
+    if args.out_dir is not None:
+        Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+
+    results, failures = run_batch(partial(_pack_one, out_dir=args.out_dir, unpack=args.unpack),
+                                  paths, args.workers)
+    before = after = 0
+    for path, (output, size, new_size) in results:
+        before += size
+        after += new_size
+        print(f"{path.name} -> '{output}': {size / 1e6:.2f} MB -> {new_size / 1e6:.3f} MB")
+        if args.remove:
+            path.unlink()
+    if results:
+        print(f"{len(results)} file(s): {before / 1e6:.1f} MB -> {after / 1e6:.2f} MB"
+              + (f" ({before / after:.0f}x smaller)" if not args.unpack and after else ''))
+    return 1 if failures else 0
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default LINKTEST_WORKERS or one per CPU)')
+    common.add_argument('--trace', metavar='JSON', help='record a stage trace to this file')
+
+    parser = argparse.ArgumentParser(prog='python -m linktest',
+                                     description='nRF24 link-test capture and analysis.')
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    p = commands.add_parser('capture', parents=[common], help='log a Teensy to a CSV file')
+    p.add_argument('port', help="serial port, e.g. COM8 or /dev/ttyACM0")
+    p.add_argument('output', help='CSV file to write (appended to unless --new)')
+    p.add_argument('--new', action='store_true', help='overwrite the file instead of appending')
+    p.add_argument('--duration', type=float, help='stop after this many seconds')
+    p.add_argument('--metrics-port', type=int, default=8765,
+                   help='port for live JSON metrics, 0 to turn off (default 8765)')
+    p.set_defaults(func=cmd_capture)
+
+    p = commands.add_parser('fill', parents=[common], help="gap-fill raw captures into ...new.csv")
+    p.add_argument('inputs', nargs='+', help='raw capture files, folders or globs')
+    p.add_argument('-o', '--out-dir', help='folder for the outputs (default: next to each input)')
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument('--sessions', action='store_true',
+                      help='split into sessions first and keep the longest, like test.py')
+    mode.add_argument('--stream', action='store_true',
+                      help='only process lines appended since the last run')
+    p.set_defaults(func=cmd_fill)
+
+    p = commands.add_parser('metrics', parents=[common], help='per-config summary table')
+    p.add_argument('inputs', nargs='+', help='processed files, folders or globs')
+    p.add_argument('--bin-ms', type=int, default=100, help='bin size for packets/s (default 100)')
+    p.add_argument('-o', '--output', help='CSV file to save the table to')
+    p.set_defaults(func=cmd_metrics)
+
+    p = commands.add_parser('clock', parents=[common],
+                            help='host clock offset, skew and serial latency per session')
+    p.add_argument('inputs', nargs='+', help='raw or processed files, folders or globs')
+    p.add_argument('-o', '--output', help='CSV file to save the table to')
+    p.set_defaults(func=cmd_clock)
+
+    p = commands.add_parser('dashboard', parents=[common],
+                            help='browse processed files and CAN logs in a web browser')
+    p.add_argument('inputs', nargs='+', help='processed files, CAN logs, folders or globs')
+    p.add_argument('--port', type=int, default=8050, help='port to serve on (default 8050)')
+    p.add_argument('--host', default='127.0.0.1',
+                   help='address to serve on (default 127.0.0.1, this computer only)')
+    p.add_argument('--no-browser', action='store_true', help="don't open a browser window")
+    p.set_defaults(func=cmd_dashboard)
+
+    p = commands.add_parser('index', parents=[common], help='bring the dataset catalog up to date')
+    p.add_argument('roots', nargs='*', help='folders or files to index (default: the whole repo)')
+    p.set_defaults(func=cmd_index)
+
+    p = commands.add_parser('find', parents=[common], help='look datasets up in the catalog')
+    p.add_argument('--kind', choices=['raw', 'processed', 'can', 'other'])
+    p.add_argument('--rate', help='data rate from the file name: 250kbps, 1mbps or 2mbps')
+    p.add_argument('--day', help='test day YYYY-MM-DD, or a prefix such as 2025-03')
+    p.add_argument('--min-distance', type=int, metavar='M')
+    p.add_argument('--max-distance', type=int, metavar='M')
+    p.add_argument('--power-level', type=int, metavar='PL', help='files with this PowerLevel in them')
+    p.add_argument('--name', help="SQL LIKE pattern on the file name, e.g. '%%walking%%'")
+    p.add_argument('--max-loss', type=float, metavar='PCT', help='at most this packet loss in %%')
+    p.add_argument('--paths', action='store_true', help='only print the paths, for piping into a command')
+    p.set_defaults(func=cmd_find)
+
+    p = commands.add_parser('pack', parents=[common],
+                            help='store processed files run-length packed (.rle), or back as CSV')
+    p.add_argument('inputs', nargs='+', help='processed files, folders or globs')
+    p.add_argument('-o', '--out-dir', help='folder for the outputs (default: next to each input)')
+    p.add_argument('--unpack', action='store_true', help='write packed files back out as CSV')
+    p.add_argument('--remove', action='store_true',
+                   help='delete each input once it has been converted (packing checks the '
+                        'round trip first)')
+    p.set_defaults(func=cmd_pack)
+
+    for name, func, help_text in (
+            ('plot', cmd_plot, 'success rate, packets/s and delay graphs per file'),
+            ('distance', cmd_distance, 'packets/s against distance from <N>m... file names'),
+            ('can', cmd_can, 'CAN frame timing, jitter and burst loss per ID')):
+        p = commands.add_parser(name, parents=[common], help=help_text)
+        p.add_argument('inputs', nargs='+', help='files, folders or globs')
+        p.add_argument('-o', '--graphs-dir',
+                       help="folder for the graphs (default: 'graphs' next to the inputs)")
+        p.add_argument('--show', action='store_true', help='show figures instead of only saving them')
+        if name == 'plot':
+            p.add_argument('--bin-ms', type=int, default=100,
+                           help='bin size for success rate and packets/s, a multiple of 10 (default 100)')
+        if name == 'can':
+            p.add_argument('--no-plot', action='store_true', help='only write the timing tables')
+        p.set_defaults(func=func)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        instrument.enable(args.trace)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""
+Host clock against Teensy millis: offset, skew and serial latency.
+
+readserial.py stamps every line with the host's HH:MM:SS when it is read,
+so a packet's host second is floor(offset + slope * millis + latency) with
+latency >= 0 (USB and read-loop buffering). Only the tick from one host
+second to the next says more than "somewhere in this second": the last
+line stamped s was read before s + 1, so the point (its millis, s + 1)
+lies on or above the line offset + slope * millis, and the lines read with
+the least delay sit right on it. The fit is therefore a lower envelope
+rather than a least-squares line:
+
+- one pass over the file, CHUNK_ROWS rows at a time, keeps one such point
+  per host second (so memory grows with the length of the capture in
+  seconds, not with its rows); one-line millis spikes are dropped, and a
+  new segment starts where millis jumps back or the two clocks disagree
+  on the time between packets (Teensy reset, logger restart)
+- the slope is the Theil-Sen median of pairwise slopes through the lowest
+  point of every WINDOW_MS window, so bursts of buffering and stray lines
+  can't tilt it
+- the offset puts the line under all but ENVELOPE_QUANTILE of the points
+- how far a point sits above the line is the extra latency of the line
+  read just before the tick. Latency percentiles use the points whose next
+  packet came within MAX_BRACKET_MS; a longer gap is lost packets rather
+  than latency
+The constant part of the latency can't be told apart from the offset, so
+offsets include it. ClockFit.host_ms() maps millis onto the host clock at
+millisecond resolution, to put several sessions on one time axis.
+"""
+import numpy as np
+import pandas as pd
+
+from .layout import PACKED_SUFFIX, sniff_layout
+
+CHUNK_ROWS = 250000
+WINDOW_MS = 10000          # one lowest point per window goes into the slope fit
+ENVELOPE_QUANTILE = 0.01   # share of points allowed under the fitted line
+MAX_BRACKET_MS = 20        # tick points with a longer gap to the next packet aren't latency samples
+MAX_PAIRS = 250000         # Theil-Sen pairs, sampled beyond this
+RESET_MS = 1000            # millis going back by more than this is a Teensy reset
+JUMP_MS = 2000             # host and millis disagreeing on elapsed time by more is a new session
+DAY_MS = 86400000
+
+SUMMARY_COLUMNS = ['segment', 'rows', 'start', 'duration_s', 'points', 'offset_ms',
+                   'skew_ppm', 'drift_ms', 'latency_p50', 'latency_p95', 'latency_p99',
+                   'latency_max', 'latency_points']
+
+
+def _seconds_of_day(times):
+    """HH:MM:SS strings to seconds since midnight, -1 where unreadable; each distinct value parsed once."""
+    codes, uniques = pd.factorize(times)
+    values = np.full(len(uniques) + 1, -1, dtype=np.int64)  # last slot for missing values
+    for k, text in enumerate(uniques):
+        parts = str(text).strip().split(':')
+        if len(parts) == 3 and all(part.isdigit() for part in parts):
+            values[k] = int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
+    return values[codes]
+
+
+def _theil_sen(x, y, max_pairs=MAX_PAIRS):
+    """Median slope over all pairs of points (a seeded sample of them for many points)."""
+    n = len(x)
+    if n * (n - 1) // 2 <= max_pairs:
+        i, j = np.triu_indices(n, 1)
+    else:
+        rng = np.random.default_rng(0)
+        i, j = rng.integers(0, n, max_pairs), rng.integers(0, n, max_pairs)
+    dx = x[j] - x[i]
+    ok = dx != 0
+    return float(np.median((y[j] - y[i])[ok] / dx[ok]))
+
+
+class ClockFit:
+    """
+    Host clock as offset_ms + slope * millis for one segment of a capture,
+    in ms since midnight of the day the capture started. Keeps the tick
+    points (millis, host ms, gap to the next packet) it was fitted to.
+    """
+
+    def __init__(self, x, y, bracket, rows, start_millis, end_millis):
+        self.x, self.y, self.bracket = x, y, bracket
+        self.rows = rows
+        self.start_millis, self.end_millis = start_millis, end_millis
+
+        if len(x) == 0:
+            self.slope, self.offset_ms = np.nan, np.nan
+            self.windows = 0
+            self.latency = np.zeros(0)
+            return
+        # Lowest point (least apparent delay) of every window
+        apparent = y - x
+        window = x // WINDOW_MS
+        order = np.lexsort((apparent, window))
+        lowest = order[np.r_[True, window[order][1:] != window[order][:-1]]]
+        # A single window has nothing to measure skew against; assume none
+        self.windows = len(lowest)
+        self.slope = _theil_sen(x[lowest], y[lowest]) if self.windows > 1 else 1.0
+        self.offset_ms = float(np.quantile(y - self.slope * x, ENVELOPE_QUANTILE))
+
+        above = y - self.host_ms(x)
+        self.latency = np.maximum(above[bracket <= MAX_BRACKET_MS], 0)
+
+    def host_ms(self, millis):
+        """Host time (ms since midnight of the first day) of Teensy 'millis'."""
+        return self.offset_ms + self.slope * np.asarray(millis, dtype=np.float64)
+
+    def summary(self):
+        """One SUMMARY_COLUMNS row (without 'segment') as a dict."""
+        start = self.host_ms(self.start_millis) if len(self.x) else np.nan
+        duration = (self.end_millis - self.start_millis) / 1000
+        skew = (self.slope - 1) * 1e6 if self.windows > 1 else np.nan
+        latency = (np.percentile(self.latency, [50, 95, 99, 100]) if len(self.latency)
+                   else [np.nan] * 4)
+        return {
+            'rows': self.rows,
+            'start': (f"{int(start // 3600000) % 24:02d}:{int(start // 60000) % 60:02d}:"
+                      f"{int(start // 1000) % 60:02d}" if np.isfinite(start) else ''),
+            'duration_s': duration,
+            'points': len(self.x),
+            'offset_ms': self.offset_ms,
+            'skew_ppm': skew,
+            'drift_ms': skew * 1e-6 * duration * 1000,
+            'latency_p50': latency[0],
+            'latency_p95': latency[1],
+            'latency_p99': latency[2],
+            'latency_max': latency[3],
+            'latency_points': len(self.latency),
+        }
+
+
+class ClockEstimator:
+    """
+    Streaming collector of tick points. Feed update() the millis and host
+    seconds of received packets in file order, chunk by chunk, then call
+    finish() for one ClockFit per segment.
+    """
+
+    def __init__(self):
+        self._held = None      # last row of the previous chunk, waiting for its right neighbour
+        self._left = None      # millis of the row before it
+        self._last = None      # (millis, host ms) of the last row kept
+        self._days = 0         # midnights crossed
+        self._segments = []
+
+    def update(self, millis, seconds):
+        millis = np.asarray(millis, dtype=np.int64)
+        seconds = np.asarray(seconds, dtype=np.int64)
+        if self._held is not None:
+            millis = np.r_[self._held[0], millis]
+            seconds = np.r_[self._held[1], seconds]
+        if len(millis) < 2:
+            self._held = (millis, seconds) if len(millis) else self._held
+            return
+
+        # One-row spikes: out of line with both neighbours while they agree.
+        # The last row waits for the next chunk to be judged
+        judged, right = millis[:-1], millis[1:]
+        left = np.r_[judged[0] if self._left is None else self._left, judged[:-1]]
+        spike = (left <= right) & ~((left <= judged) & (judged <= right))
+        self._left = judged[-1]
+        self._held = (millis[-1:], seconds[-1:])
+        self._consume(judged[~spike], seconds[:-1][~spike])
+
+    def _consume(self, millis, seconds):
+        if len(millis) == 0:
+            return
+        first = self._last is None
+        prev_millis = np.r_[millis[0] if first else self._last[0], millis[:-1]]
+
+        # Midnight: the host clock of day drops by most of a day
+        host = seconds * 1000
+        prev_of_day = np.r_[host[0] if first else self._last[1] % DAY_MS, host[:-1]]
+        wrap = host < prev_of_day - DAY_MS // 2
+        host = host + DAY_MS * (self._days + np.cumsum(wrap))
+        self._days += int(wrap.sum())
+        prev_host = np.r_[host[0] if first else self._last[1], host[:-1]]
+
+        elapsed_gap = (host - prev_host) - (millis - prev_millis)
+        breaks = (millis < prev_millis - RESET_MS) | (np.abs(elapsed_gap) > JUMP_MS)
+        if first:
+            breaks[0] = True
+        tick = (host > prev_host) & (millis >= prev_millis) & ~breaks
+
+        segment_of_row = len(self._segments) - 1 + np.cumsum(breaks)
+        for _ in range(int(breaks.sum())):
+            self._segments.append({'x': [], 'y': [], 'bracket': [], 'rows': 0,
+                                   'start_millis': None, 'end_millis': None})
+        for number in np.unique(segment_of_row):
+            rows = segment_of_row == number
+            segment = self._segments[number]
+            points = rows & tick
+            segment['x'].append(prev_millis[points])
+            segment['y'].append(prev_host[points] + 1000)
+            segment['bracket'].append((millis - prev_millis)[points])
+            segment['rows'] += int(rows.sum())
+            if segment['start_millis'] is None:
+                segment['start_millis'] = int(millis[rows][0])
+            segment['end_millis'] = int(millis[rows][-1])
+        self._last = (int(millis[-1]), int(host[-1]))
+
+    def finish(self):
+        """One ClockFit per segment; the estimator can't be fed after this."""
+        if self._held is not None:
+            self._consume(*self._held)
+            self._held = None
+        fits = []
+        for segment in self._segments:
+            x = np.concatenate(segment['x']).astype(np.float64)
+            y = np.concatenate(segment['y']).astype(np.float64)
+            bracket = np.concatenate(segment['bracket'])
+            fits.append(ClockFit(x, y, bracket, segment['rows'],
+                                 segment['start_millis'], segment['end_millis']))
+        return fits
+
+
+def clock_columns(path):
+    """
+    (layout, raw names, host time column, millis column) for 'path', or None
+    for files without the host's HH:MM:SS next to millis (13022025 logs,
+    CAN logs, empty files).
+    """
+    layout, names = sniff_layout(path)
+    if layout == 'raw' and 'Timestamp' in names:
+        return layout, names, 'Timestamp', 'Millis'
+    if layout == 'processed':
+        if str(path).endswith(PACKED_SUFFIX):
+            from .packed import PackedDataset
+
+            header = PackedDataset(path).columns
+        else:
+            with open(path, 'r', newline='') as f:
+                header = f.readline().strip().split(',')
+        # 13022025 processed files call millis 'Timestamp'
+        for time_column, millis_column in (('Timestamp', 'Millis'), ('CurrentTime', 'Timestamp_ms')):
+            if time_column in header and millis_column in header:
+                return layout, None, time_column, millis_column
+    return None
+
+
+def _clock_chunks(path, chunk_rows=CHUNK_ROWS):
+    """(millis, host seconds) of the received packets in 'path', a chunk at a time."""
+    columns = clock_columns(path)
+    if columns is None:
+        raise ValueError(f"{path} has no host clock column")
+    layout, names, time_column, millis_column = columns
+    if layout == 'processed' and str(path).endswith(PACKED_SUFFIX):
+        from .packed import PackedDataset
+
+        # Already small in memory; decoded as text like the CSV chunks
+        indicator = 'Indicator'
+        frame = PackedDataset(path).to_frame([time_column, millis_column, indicator])
+        frame = frame.astype(str)
+        reader = (frame.iloc[start:start + chunk_rows] for start in range(0, len(frame), chunk_rows))
+    elif layout == 'raw':
+        indicator = None
+        reader = pd.read_csv(path, header=None, names=names, usecols=[time_column, millis_column],
+                             dtype=str, chunksize=chunk_rows, on_bad_lines='skip')
+    else:
+        indicator = 'Indicator'
+        reader = pd.read_csv(path, usecols=[time_column, millis_column, indicator],
+                             dtype=str, chunksize=chunk_rows)
+
+    for chunk in reader:
+        millis = pd.to_numeric(chunk[millis_column], errors='coerce').to_numpy(dtype=np.float64)
+        seconds = _seconds_of_day(chunk[time_column])
+        keep = ~np.isnan(millis) & (seconds >= 0)
+        if indicator is not None:
+            # Gap-filled rows carry copied times and interpolated millis
+            keep &= (chunk[indicator] == '1').to_numpy()
+        yield millis[keep].astype(np.int64), seconds[keep]
+
+
+def estimate_clock(path, chunk_rows=CHUNK_ROWS):
+    """
+    Fits the host clock against millis for a raw capture or a processed
+    file, reading 'chunk_rows' rows at a time. Returns a list of ClockFit,
+    one per segment (Teensy reset or logger restart) in file order.
+    """
+    estimator = ClockEstimator()
+    for millis, seconds in _clock_chunks(path, chunk_rows):
+        estimator.update(millis, seconds)
+    return estimator.finish()
+
+
+def clock_summary(fits):
+    """SUMMARY_COLUMNS table for a list of ClockFit."""
+    rows = [{'segment': number, **fit.summary()} for number, fit in enumerate(fits, 1)]
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
@@ -0,0 +1,467 @@
+"""
+Browser dashboard for reviewing long runs without plotting every point.
+
+A 30-minute drive is hundreds of thousands of rows, and matplotlib draws
+every one of them on each pan. Here a small local HTTP server keeps each
+dataset's packet-rate pyramid (linktest.pyramid) or CAN frame store
+(linktest.can) in memory, and the page asks it for the visible time range
+at its own width in pixels. Every pixel column gets the min, max and mean
+of the bins under it, from the coarsest pyramid level that still has a
+bin per column, so a request costs about as much as the picture it draws
+whatever the length of the run. Zooming in asks again and gets finer bins.
+
+- processed files: packets per second and success rate per config, with
+  the Week 9 distance checkpoints ('counter') as coloured bands the way
+  moregraphs.py colours them
+- CAN logs: frames per second or one payload byte per CAN ID
+
+    python -m linktest dashboard "Week 9 combined/24032025" "Live DTI"
+"""
+import json
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from .cache import load_csv
+from .can import load_can_log
+from .can_timing import reception_times
+from .layout import sniff_layout
+from .metrics import standard_columns
+from .pyramid import LEVELS_MS, load_pyramid
+
+# moregraphs.py's distance checkpoints, logged in the 'counter' column
+COUNTER_GROUPS = [
+    ("0m to 50m", [0]),
+    ("50m to 100m", [1]),
+    ("100m to 150m", [2]),
+    ("150m to 200m", [3, 4]),
+    ("200m to 250m", [5]),
+    ("250m to 300m", [6]),
+    ("300m to 350m", [7]),
+    ("350m +", [8]),
+]
+
+LINK_METRICS = [('pps', 'Packets per second'), ('success', 'Success rate (%)')]
+CAN_METRICS = [('rate', 'Frames per second')] + [(f'b{k}', f'Payload byte {k}') for k in range(8)]
+
+
+def _columns(times, start, span):
+    """Pixel column of each of the sorted 'times', and where each column's run starts."""
+    column = ((times - start) // span).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, np.diff(column) != 0])
+    return column[starts], starts
+
+
+def _series(name, start, span, column, low, high, mean):
+    return {
+        'name': name,
+        'x': np.round(start + (column + 0.5) * span, 1).tolist(),
+        'min': np.round(low, 2).tolist(),
+        'max': np.round(high, 2).tolist(),
+        'mean': np.round(mean, 2).tolist(),
+    }
+
+
+class LinkDataset:
+    """A processed file: its pyramid and the runs of its 'counter' column."""
+
+    metrics = LINK_METRICS
+
+    def __init__(self, path):
+        self.name = Path(path).name
+        df = standard_columns(load_csv(path))
+        if 'DataRate' not in df or 'Millis' not in df:
+            raise ValueError("no DataRate/PowerLevel or millis columns to bin")
+        self.pyramid = load_pyramid(path)
+        self.start, self.end = self.pyramid.extent()
+        self.names = self.pyramid.configs
+        self.segments = []
+        if 'counter' in df:
+            # Checkpoint runs as [start millis, end millis, counter]
+            millis = df['Millis'].to_numpy(dtype=np.float64, na_value=np.nan)
+            counter = df['counter'].to_numpy(dtype=np.float64, na_value=np.nan)
+            keep = ~np.isnan(millis) & ~np.isnan(counter)
+            millis, counter = millis[keep], counter[keep]
+            if len(millis):
+                starts = np.flatnonzero(np.r_[True, np.diff(counter) != 0])
+                ends = np.r_[starts[1:] - 1, len(millis) - 1]
+                self.segments = [[float(millis[a]), float(millis[b]), int(counter[a])]
+                                 for a, b in zip(starts, ends)]
+
+    def _slots(self, low, high, level):
+        """Bins of 'level' whose centres fall in [low, high), counting only the file's extent."""
+        low = np.maximum(low, self.start)
+        high = np.minimum(high, self.end)
+        count = np.ceil((high - level / 2) / level) - np.ceil((low - level / 2) / level)
+        return np.maximum(count, 0).astype(np.int64)
+
+    def series(self, metric, start, end, width):
+        span = max((end - start) / width, LEVELS_MS[0])
+        level = max(size for size in LEVELS_MS if size <= span)
+        result = []
+        for config in self.names:
+            bins, counts, successes = self.pyramid.level_bins(level, config, start, end)
+            if len(bins) == 0:
+                continue
+            column, starts = _columns(bins * level + level / 2, start, span)
+            if metric == 'pps':
+                # Empty bins aren't stored but are 0 pps: divide by every bin
+                # slot of the column (within the file) and floor the minimum
+                # of columns with a slot missing
+                values = successes * (1000 / level)
+                slots = self._slots(start + column * span, start + (column + 1) * span, level)
+                stored = np.diff(np.r_[starts, len(values)])
+                mean = np.add.reduceat(successes, starts) * (1000 / level) / np.maximum(slots, 1)
+                low = np.where(stored < slots, 0.0, np.minimum.reduceat(values, starts))
+                high = np.maximum.reduceat(values, starts)
+                # Columns with no stored bin at all (outages) are 0 too
+                every = np.arange(column[0], column[-1] + 1)
+                filled = np.zeros((3, len(every)))
+                filled[:, column - column[0]] = low, high, mean
+                keep = self._slots(start + every * span, start + (every + 1) * span, level) > 0
+                result.append(_series(config, start, span, every[keep], *filled[:, keep]))
+                continue
+            else:
+                values = successes / counts * 100
+                mean = np.add.reduceat(successes, starts) / np.add.reduceat(counts, starts) * 100
+                low = np.minimum.reduceat(values, starts)
+            result.append(_series(config, start, span, column, low,
+                                  np.maximum.reduceat(values, starts), mean))
+        segments = [s for s in self.segments if s[1] >= start and s[0] <= end]
+        return {'series': result, 'segments': segments, 'span': span, 'level': level}
+
+
+class CanDataset:
+    """A CAN log's frame store; one series per CAN ID."""
+
+    metrics = CAN_METRICS
+    segments = []
+
+    def __init__(self, path):
+        self.name = Path(path).name
+        self.log = load_can_log(path)
+        times = self.log.frames['timestamp']
+        self.start = int(times.min()) if len(times) else None
+        self.end = int(times.max()) + 1 if len(times) else None
+        self.names = [f'0x{can_id:04X}' for can_id in self.log.ids]
+
+    def series(self, metric, start, end, width):
+        span = max((end - start) / width, 1)
+        result = []
+        for can_id, name in zip(self.log.ids, self.names):
+            frames = self.log.frames_for(can_id, start, end)
+            if len(frames) == 0:
+                continue
+            if metric == 'rate':
+                # Receptions (distinct timestamps; the logger reprints frames)
+                # per second in every column of the log, empty ones as 0
+                times = reception_times(frames)
+                low = max(start, self.start)
+                high = min(end, self.end)
+                every = np.arange(int((low - start) // span), int(np.ceil((high - start) / span)))
+                received = np.bincount(((times - start) // span).astype(np.int64) - every[0],
+                                       minlength=len(every))[:len(every)]
+                covered = (np.minimum(start + (every + 1) * span, high)
+                           - np.maximum(start + every * span, low))
+                values = received * 1000 / np.maximum(covered, 1)
+                result.append(_series(name, start, span, every, values, values, values))
+                continue
+            times = frames['timestamp'].astype(np.int64)
+            column, starts = _columns(times, start, span)
+            values = frames['data'][:, int(metric[1:])].astype(np.float64)
+            mean = np.add.reduceat(values, starts) / np.diff(np.r_[starts, len(values)])
+            result.append(_series(name, start, span, column, np.minimum.reduceat(values, starts),
+                                  np.maximum.reduceat(values, starts), mean))
+        return {'series': result, 'segments': [], 'span': span, 'level': None}
+
+
+def open_dataset(path):
+    """LinkDataset or CanDataset for 'path' by its layout; ValueError for other files."""
+    layout = sniff_layout(path)[0]
+    if layout == 'processed':
+        return LinkDataset(path)
+    if layout == 'can':
+        return CanDataset(path)
+    raise ValueError(f"{Path(path).name} is neither a processed file nor a CAN log")
+
+
+class Dashboard:
+    """The datasets being served and the JSON answers for the page."""
+
+    def __init__(self, paths):
+        self.datasets = []
+        for path in paths:
+            try:
+                dataset = open_dataset(path)
+            except Exception as e:
+                print(f"Leaving out {Path(path).name}: {type(e).__name__}: {e}")
+                continue
+            if dataset.start is None:
+                print(f"Leaving out {dataset.name}: no data")
+                continue
+            self.datasets.append(dataset)
+
+    def listing(self):
+        return [{'id': i, 'name': d.name, 'start': d.start, 'end': d.end, 'names': d.names,
+                 'metrics': d.metrics, 'counter_groups': COUNTER_GROUPS if d.segments else []}
+                for i, d in enumerate(self.datasets)]
+
+    def series(self, query):
+        """Answer to /api/series?dataset=&metric=&start=&end=&width= (a parse_qs dict)."""
+        dataset = self.datasets[int(query['dataset'][0])]
+        metric = query.get('metric', [dataset.metrics[0][0]])[0]
+        if metric not in dict(dataset.metrics):
+            raise ValueError(f"unknown metric '{metric}'")
+        start = float(query.get('start', [dataset.start])[0])
+        end = float(query.get('end', [dataset.end])[0])
+        width = min(max(int(query.get('width', ['1000'])[0]), 1), 10000)
+        if end <= start:
+            raise ValueError("end has to be after start")
+        answer = dataset.series(metric, start, end, width)
+        answer['points'] = sum(len(s['x']) for s in answer['series'])
+        return answer
+
+
+def serve_dashboard(paths, port=8050, host='127.0.0.1', open_browser=True):
+    """Serves the dashboard for 'paths' until interrupted (Ctrl+C)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    dashboard = Dashboard(paths)
+    if not dashboard.datasets:
+        print("Nothing to show.")
+        return 1
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type='application/json'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            try:
+                if url.path == '/':
+                    self._send(200, PAGE.encode(), 'text/html; charset=utf-8')
+                elif url.path == '/api/datasets':
+                    self._send(200, json.dumps(dashboard.listing()).encode())
+                elif url.path == '/api/series':
+                    self._send(200, json.dumps(dashboard.series(parse_qs(url.query))).encode())
+                else:
+                    self._send(404, json.dumps({'error': 'not found'}).encode())
+            except (KeyError, IndexError, ValueError) as e:
+                self._send(400, json.dumps({'error': f"bad request: {e}"}).encode())
+
+        def log_message(self, format, *args):
+            pass  # one line per zoom step would bury everything else
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        print(f"Can't serve the dashboard on port {port}: {e}")
+        return 1
+    url = f"http://{host}:{port}/"
+    print(f"Serving {len(dashboard.datasets)} dataset(s) on {url} (Ctrl+C to stop)")
+    if open_browser:
+        import webbrowser
+        webbrowser.open(url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>linktest dashboard</title>
+<style>
+body { font: 13px sans-serif; margin: 0; display: flex; flex-direction: column; height: 100vh; }
+#bar { padding: 6px 8px; display: flex; gap: 8px; align-items: center; border-bottom: 1px solid #ccc; }
+#help { margin-left: auto; color: #777; }
+#chart { flex: 1; position: relative; min-height: 200px; }
+canvas { position: absolute; left: 0; top: 0; cursor: grab; }
+#legend { padding: 4px 8px 8px; }
+.key { display: inline-block; margin-right: 14px; }
+.swatch { display: inline-block; width: 10px; height: 10px; margin-right: 4px; }
+</style></head>
+<body>
+<div id="bar"><select id="dataset"></select><select id="metric"></select><span id="status"></span>
+<span id="help">wheel: zoom &middot; drag: pan &middot; double-click: whole run</span></div>
+<div id="chart"><canvas id="canvas"></canvas></div>
+<div id="legend"></div>
+<script>
+const COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b',
+                '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'];
+const DARK2 = ['#1b9e77', '#d95f02', '#7570b3', '#e7298a', '#66a61e', '#e6ab02', '#a6761d', '#666666'];
+const M = {left: 60, right: 12, top: 10, bottom: 32};
+const $ = id => document.getElementById(id);
+const canvas = $('canvas'), ctx = canvas.getContext('2d');
+let datasets = [], current = null, view = null, data = null, ticket = 0, timer = null, drag = null;
+
+async function getJSON(url) {
+  const response = await fetch(url);
+  const body = await response.json();
+  if (!response.ok) throw new Error(body.error);
+  return body;
+}
+
+function plotWidth() { return Math.max(canvas.width - M.left - M.right, 10); }
+function plotHeight() { return Math.max(canvas.height - M.top - M.bottom, 10); }
+function toX(t) { return M.left + (t - view[0]) / (view[1] - view[0]) * plotWidth(); }
+function toTime(x) { return view[0] + (x - M.left) / plotWidth() * (view[1] - view[0]); }
+
+function groupOf(counter) {
+  return current.counter_groups.findIndex(group => group[1].includes(counter));
+}
+
+function select(id) {
+  current = datasets[id];
+  const metric = $('metric');
+  metric.length = 0;
+  for (const [value, label] of current.metrics) metric.add(new Option(label, value));
+  view = [current.start, current.end];
+  data = null;
+  legend();
+  request();
+}
+
+function request() {
+  // Debounced so a burst of wheel steps only asks once
+  clearTimeout(timer);
+  timer = setTimeout(async () => {
+    const mine = ++ticket;
+    const query = new URLSearchParams({dataset: current.id, metric: $('metric').value,
+      start: Math.floor(view[0]), end: Math.ceil(view[1]), width: Math.round(plotWidth())});
+    $('status').textContent = 'loading...';
+    try {
+      const answer = await getJSON('/api/series?' + query);
+      if (mine !== ticket) return;  // a newer view was asked for meanwhile
+      data = answer;
+      $('status').textContent = `${answer.points} points` +
+        (answer.level ? `, ${answer.level} ms bins` : '');
+    } catch (error) {
+      $('status').textContent = error.message;
+    }
+    draw();
+  }, 60);
+}
+
+function niceStep(range, count) {
+  const raw = range / count, power = Math.pow(10, Math.floor(Math.log10(raw)));
+  for (const m of [1, 2, 5, 10]) if (m * power >= raw) return m * power;
+  return 10 * power;
+}
+
+function draw() {
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  if (!data || !view) return;
+  const w = plotWidth(), h = plotHeight();
+  let low = 0, high = -Infinity;
+  for (const s of data.series) for (const v of s.max) high = Math.max(high, v);
+  if (!(high > low)) high = low + 1;
+  high *= 1.05;
+  const toY = v => M.top + h - (v - low) / (high - low) * h;
+
+  ctx.save();
+  ctx.beginPath();
+  ctx.rect(M.left, M.top, w, h);
+  ctx.clip();
+  for (const [a, b, counter] of data.segments) {
+    const group = groupOf(counter);
+    ctx.fillStyle = (group < 0 ? '#999999' : DARK2[group % DARK2.length]) + '30';
+    ctx.fillRect(toX(a), M.top, Math.max(toX(b) - toX(a), 1), h);
+  }
+  data.series.forEach(s => {
+    const color = COLORS[current.names.indexOf(s.name) % COLORS.length];
+    // Min-max band, one bar per pixel column
+    ctx.fillStyle = color + '55';
+    for (let i = 0; i < s.x.length; i++) {
+      ctx.fillRect(toX(s.x[i]) - 0.5, toY(s.max[i]), 1.5, Math.max(toY(s.min[i]) - toY(s.max[i]), 1));
+    }
+    // Mean line, broken where columns are missing (no packets logged)
+    ctx.strokeStyle = color;
+    ctx.lineWidth = 1.5;
+    ctx.beginPath();
+    for (let i = 0; i < s.x.length; i++) {
+      const gap = i === 0 || s.x[i] - s.x[i - 1] > 1.5 * data.span;
+      if (gap) ctx.moveTo(toX(s.x[i]), toY(s.mean[i]));
+      else ctx.lineTo(toX(s.x[i]), toY(s.mean[i]));
+    }
+    ctx.stroke();
+  });
+  ctx.restore();
+
+  ctx.strokeStyle = '#333';
+  ctx.fillStyle = '#333';
+  ctx.lineWidth = 1;
+  ctx.strokeRect(M.left, M.top, w, h);
+  ctx.textAlign = 'center';
+  const xStep = niceStep((view[1] - view[0]) / 1000, 8);
+  for (let s = Math.ceil(view[0] / 1000 / xStep) * xStep; s * 1000 <= view[1]; s += xStep) {
+    const x = toX(s * 1000);
+    ctx.fillRect(x, M.top + h, 1, 4);
+    ctx.fillText(+s.toFixed(3) + ' s', x, M.top + h + 16);
+  }
+  ctx.textAlign = 'right';
+  const yStep = niceStep(high - low, 5);
+  for (let v = 0; v <= high; v += yStep) {
+    ctx.fillRect(M.left - 4, toY(v), 4, 1);
+    ctx.fillText(+v.toFixed(2), M.left - 6, toY(v) + 4);
+  }
+}
+
+function legend() {
+  const keys = current.names.map((name, i) =>
+    `<span class="key"><span class="swatch" style="background:${COLORS[i % COLORS.length]}"></span>${name}</span>`);
+  current.counter_groups.forEach(([label], i) => keys.push(
+    `<span class="key"><span class="swatch" style="background:${DARK2[i % DARK2.length]}55"></span>${label}</span>`));
+  $('legend').innerHTML = keys.join('');
+}
+
+function clampView(start, end) {
+  const total = current.end - current.start, length = Math.min(Math.max(end - start, 20), total);
+  start = Math.min(Math.max(start, current.start), current.end - length);
+  return [start, start + length];
+}
+
+canvas.addEventListener('wheel', event => {
+  event.preventDefault();
+  const t = toTime(event.offsetX), factor = event.deltaY < 0 ? 0.8 : 1.25;
+  view = clampView(t - (t - view[0]) * factor, t + (view[1] - t) * factor);
+  draw();
+  request();
+});
+canvas.addEventListener('mousedown', event => { drag = {x: event.clientX, view: view.slice()}; });
+window.addEventListener('mousemove', event => {
+  if (!drag) return;
+  const shift = (event.clientX - drag.x) / plotWidth() * (drag.view[1] - drag.view[0]);
+  view = clampView(drag.view[0] - shift, drag.view[1] - shift);
+  draw();
+});
+window.addEventListener('mouseup', () => { if (drag) { drag = null; request(); } });
+canvas.addEventListener('dblclick', () => { view = [current.start, current.end]; draw(); request(); });
+
+function resize() {
+  const box = $('chart').getBoundingClientRect();
+  canvas.width = box.width;
+  canvas.height = box.height;
+  draw();
+}
+
+window.addEventListener('resize', () => { resize(); if (current) request(); });
+$('dataset').addEventListener('change', () => select(+$('dataset').value));
+$('metric').addEventListener('change', request);
+
+getJSON('/api/datasets').then(list => {
+  datasets = list;
+  for (const d of datasets) $('dataset').add(new Option(d.name, d.id));
+  resize();
+  if (datasets.length) select(0);
+});
+</script>
+</body></html>
+"""
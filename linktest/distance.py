@@ -0,0 +1,150 @@
+"""
+Packets per second against distance, from files named after their distance.
+
+Every processed file of a distance test ('150m1mpbsnew.csv' ...) holds a
+few configurations; each gets its steadiest 30 s window from
+linktest.windows and the received packets per second inside it. Windows
+can be overridden by hand with {(distance, config): (start_millis,
+end_millis) or None}, None leaving that configuration out.
+channel_by_distance() reports how the losses in those same windows were
+spread (loss-run lengths and a Gilbert-Elliott fit, linktest.channel).
+"""
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .batch import run_batch
+from .cache import load_csv
+from .catalog import name_metadata
+from .metrics import config_codes
+from .windows import load_windows
+
+
+def extract_distance(filename):
+    """Extract distance from filename (e.g., '150m1mpbsnew.csv' -> 150)"""
+    return name_metadata(filename)['distance_m']
+
+
+def file_pps(csv_file, overrides=None, messages=None):
+    """
+    Average PPS for each configuration in one file, as {config: pps}.
+    Progress lines are printed, or appended to the list 'messages' when
+    given (pool workers hand them back to be printed in order).
+    """
+    csv_file = Path(csv_file)
+    overrides = overrides or {}
+    distance = extract_distance(csv_file.name)
+    report = print if messages is None else messages.append
+    report(f"\nProcessing {csv_file.name}...")
+    windows = load_windows(csv_file)
+
+    pps = {}
+    for window in windows.itertuples(index=False):
+        config = window.Config
+        received = window.received
+        start_millis, end_millis = window.start_millis, window.end_millis
+        if (distance, config) in overrides:
+            override = overrides[(distance, config)]
+            if override is None:
+                report(f"Skipping {config} at {distance}m - left out by hand")
+                continue
+            start_millis, end_millis = override
+            # Count received packets of this configuration inside the hand-picked window
+            df = load_csv(csv_file)  # Timestamp already parsed by the cache
+            codes, configs = config_codes(df)
+            millis = df['Millis'].to_numpy(dtype=np.float64)
+            mask = ((codes == configs.index(config)) &
+                    (millis >= start_millis) & (millis <= end_millis))
+            received = int(df['Indicator'].to_numpy()[mask].sum())
+        report(f"{config} at {distance}m: Using period {start_millis:.0f}ms to {end_millis:.0f}ms")
+
+        # Calculate average PPS during the period (received packets only, the
+        # gap-filled rows are packets that never arrived)
+        duration = (end_millis - start_millis) / 1000  # convert to seconds
+        pps[config] = received / duration if duration > 0 else 0
+    return pps
+
+
+def _logged_pps(csv_file, overrides=None):
+    """file_pps() with its progress lines returned as ({config: pps}, messages)."""
+    messages = []
+    return file_pps(csv_file, overrides, messages), messages
+
+
+def pps_by_distance(csv_files, overrides=None, workers=None):
+    """
+    file_pps() for every file with a distance in its name, one per worker
+    process. Returns {config: {'distances': [...], 'pps': [...]}} in
+    distance order, so the result doesn't depend on which file finished first.
+    """
+    csv_files = [Path(f) for f in csv_files if extract_distance(Path(f).name) is not None]
+    file_results, failures = run_batch(partial(_logged_pps, overrides=overrides), csv_files,
+                                       workers)
+    # Progress of every file in input order, not interleaved by the workers
+    for csv_file, (pps, messages) in file_results:
+        for message in messages:
+            print(message)
+    file_results = [(csv_file, pps) for csv_file, (pps, _) in file_results]
+
+    results = {}
+    file_results.sort(key=lambda item: (extract_distance(item[0].name), item[0].name))
+    for csv_file, pps in file_results:
+        distance = extract_distance(csv_file.name)
+        for config, value in pps.items():
+            results.setdefault(config, {'distances': [], 'pps': []})
+            results[config]['distances'].append(distance)
+            results[config]['pps'].append(value)
+    return results
+
+
+def _override_windows(windows, distance, overrides):
+    """The windows table with hand-picked windows swapped in and left-out configs dropped."""
+    rows = []
+    for window in windows.itertuples(index=False):
+        override = overrides.get((distance, window.Config), (window.start_millis,
+                                                             window.end_millis))
+        if override is not None:
+            rows.append((window.Config, *override))
+    return pd.DataFrame(rows, columns=['Config', 'start_millis', 'end_millis'])
+
+
+def file_channel(csv_file, overrides=None):
+    """
+    Burst loss in the windows file_pps() uses, for one file. Returns
+    (channel_summary() table, run_table() of every window with a Config
+    column), both with the distance in front.
+    """
+    from .channel import channel_summary, run_table, window_channel
+
+    csv_file = Path(csv_file)
+    distance = extract_distance(csv_file.name)
+    windows = _override_windows(load_windows(csv_file), distance, overrides or {})
+    results = window_channel(load_csv(csv_file), windows)
+    summary = channel_summary(results)
+    runs = [run_table(stats).assign(Config=config) for config, _, _, stats in results]
+    runs = (pd.concat(runs, ignore_index=True) if runs
+            else pd.DataFrame(columns=['run', 'length', 'runs', 'Config']))
+    summary.insert(0, 'distance', distance)
+    runs.insert(0, 'distance', distance)
+    return summary, runs[['distance', 'Config', 'run', 'length', 'runs']]
+
+
+def channel_by_distance(csv_files, overrides=None, workers=None):
+    """
+    file_channel() for every file with a distance in its name, one per
+    worker process. Returns (summary, runs) tables sorted by config and
+    distance; runs holds the loss-run and good-run histograms.
+    """
+    csv_files = [Path(f) for f in csv_files if extract_distance(Path(f).name) is not None]
+    file_results, failures = run_batch(partial(file_channel, overrides=overrides), csv_files,
+                                       workers)
+    if not file_results:
+        return None, None
+    summary = pd.concat([result[0] for _, result in file_results], ignore_index=True)
+    runs = pd.concat([result[1] for _, result in file_results], ignore_index=True)
+    summary = summary.sort_values(['Config', 'distance'], kind='stable', ignore_index=True)
+    runs = runs.sort_values(['Config', 'distance', 'run', 'length'], kind='stable',
+                            ignore_index=True)
+    return summary, runs
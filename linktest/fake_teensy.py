@@ -0,0 +1,88 @@
+"""
+Fake receiving Teensy on a pseudo-terminal, for trying out the capture
+path without hardware.
+
+open_fake_teensy() creates a pty, waits for the 'x' start byte like the
+real firmware and then streams 'millis,index,datarate,powerlevel' lines at
+the requested rate, optionally skipping indices to mimic packet loss, and
+finishes with 'stop'. Point capture() (or readserial.py) at the returned
+device path. Run this module directly to get a pty to test against by hand.
+"""
+import os
+import random
+import threading
+import time
+import tty
+
+
+def _stream(master, rate, packets, loss, data_rate, power_level, counter,
+            send_stop, seed):
+    rng = random.Random(seed)
+    # Wait for the start byte
+    while os.read(master, 1) != b'x':
+        pass
+
+    start = time.monotonic()
+    index = 0
+    sent = 0
+    while packets is None or index < packets:
+        # Emit everything due by now in one write, like a burst off USB serial
+        due = int((time.monotonic() - start) * rate)
+        lines = []
+        while index < due and (packets is None or index < packets):
+            index += 1
+            if loss and rng.random() < loss:
+                continue
+            millis = int(index * 1000 / rate) + 1000
+            fields = [millis, index, data_rate, power_level]
+            if counter is not None:
+                fields.append(counter)
+            lines.append(','.join(str(f) for f in fields) + '\r\n')
+        if lines:
+            try:
+                os.write(master, ''.join(lines).encode())
+            except OSError:
+                return sent  # reader went away
+            sent += len(lines)
+        time.sleep(0.001)
+    if send_stop:
+        os.write(master, b'stop\r\n')
+    return sent
+
+
+def open_fake_teensy(rate=500, packets=1000, loss=0.0, data_rate=2, power_level=3,
+                     counter=None, send_stop=True, seed=0):
+    """
+    Starts a fake Teensy on a new pty and returns (device_path, thread).
+
+    - 'rate' is packets per second, 'packets' the total to send (None runs
+      until the reader goes away)
+    - 'loss' is the chance each index is skipped
+    - 'counter' adds the Week 9 checkpoint column when not None
+    The thread is a daemon and closes the pty once it has finished sending.
+    """
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    path = os.ttyname(slave)
+
+    def run():
+        try:
+            _stream(master, rate, packets, loss, data_rate, power_level, counter,
+                    send_stop, seed)
+            time.sleep(0.5)  # let the reader drain before the pty goes away
+        finally:
+            os.close(master)
+            os.close(slave)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return path, thread
+
+
+if __name__ == '__main__':
+    path, thread = open_fake_teensy(rate=2000, packets=None)
+    print(f"Fake Teensy on {path}, Ctrl+C to stop")
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        pass
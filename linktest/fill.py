@@ -0,0 +1,125 @@
+"""
+Gap-filling of whole raw captures, whichever logger wrote them.
+
+timing_analysis.py, test.py and data analysis.py each turn one raw layout
+into a '...new.csv' with its own column list. FILL_LAYOUTS keeps those
+column lists by raw layout, so fill_file() can take any capture the
+loader recognises and write the processed file the matching script would.
+
+Captures under PURE_PYTHON_BYTES are read with the csv module and filled by
+gapfill.fill_rows(), so filling a handful of small files never waits the
+best part of a second for pandas and NumPy to import; bigger ones (or any
+file once pandas is loaded anyway) take the vectorised path. Both write
+the same bytes.
+"""
+import csv
+import os
+import sys
+from pathlib import Path
+
+from .gapfill import fill_gaps, fill_rows, to_rows
+from .instrument import traced
+from .layout import sniff_layout
+
+# Below this size a capture is read and gap-filled in plain Python
+PURE_PYTHON_BYTES = 1 << 20
+
+# Raw columns -> (columns copied forward as {output key: raw column},
+#                 floor_division, output keys, output header)
+FILL_LAYOUTS = {
+    # 13022025 / timing_analysis.py: the Teensy clock is the only time
+    ('Millis', 'Index'): (
+        {}, False,
+        ['Index', 'Millis', 'Indicator'],
+        ['Index', 'Timestamp', 'Indicator']),
+    # 27022025
+    ('Timestamp', 'Millis', 'Index'): (
+        {'Timestamp': 'Timestamp'}, False,
+        ['Index', 'Timestamp', 'Millis', 'Indicator'],
+        ['Index', 'Timestamp', 'Millis', 'Indicator']),
+    # 19032025 / test.py
+    ('Timestamp', 'Millis', 'Index', 'DataRate', 'PowerLevel'): (
+        {'Timestamp': 'Timestamp', 'DataRate': 'DataRate', 'PowerLevel': 'PowerLevel'}, False,
+        ['Index', 'Timestamp', 'Millis', 'DataRate', 'PowerLevel', 'Indicator'],
+        ['Index', 'Timestamp', 'Millis', 'DataRate', 'PowerLevel', 'Indicator']),
+    # Week 9 combined / data analysis.py, Timestamp(ms) interpolated with //
+    ('Timestamp', 'Millis', 'Index', 'DataRate', 'PowerLevel', 'counter'): (
+        {'CurrentTime': 'Timestamp', 'DataRate': 'DataRate', 'PowerLevel': 'PowerLevel',
+         'counter': 'counter'}, True,
+        ['Index', 'CurrentTime', 'Millis', 'DataRate', 'PowerLevel', 'counter', 'Indicator'],
+        ['Index', 'CurrentTime', 'Timestamp_ms', 'DataRate', 'PowerLevel', 'counter',
+         'Indicator']),
+}
+
+
+def default_output(input_path):
+    """'<name>new.csv' next to the capture, the name the scripts have always used."""
+    input_path = Path(input_path)
+    return input_path.with_name(f"{input_path.stem}new.csv")
+
+
+@traced('load', rows=lambda packets: len(packets['Index']))
+def read_raw_columns(path, names):
+    """
+    Plain-Python counterpart of read_dataset(path, parse_times=False) for raw
+    captures: a dict of lists, one per column in 'names', with header rows
+    and lines of the wrong length or with junk in a number left out.
+    """
+    numeric = [name != 'Timestamp' for name in names]
+    columns = [[] for _ in names]
+    with open(path, 'r', newline='') as lines:
+        for line in lines:
+            parts = line.strip().split(',')
+            if len(parts) != len(names):
+                continue
+            try:
+                parts = [int(part) if is_number else part
+                         for part, is_number in zip(parts, numeric)]
+            except ValueError:
+                continue
+            for column, value in zip(columns, parts):
+                column.append(value)
+    return dict(zip(names, columns))
+
+
+def fill_file(input_path, output_path=None):
+    """
+    Gap-fills a raw capture into the processed layout for its logger.
+
+    - 'output_path' defaults to default_output()
+    - HH:MM:SS times are written back exactly as logged
+    Returns (output_path, rows written, packets received); an empty file
+    gives (None, 0, 0) and nothing is written. Raises ValueError for files
+    that aren't raw captures.
+    """
+    input_path = Path(input_path)
+    output_path = Path(output_path) if output_path is not None else default_output(input_path)
+    layout, names = sniff_layout(input_path)
+    if layout is None:
+        return None, 0, 0
+    if layout != 'raw':
+        raise ValueError(f"{input_path.name} is not a raw capture ({layout})")
+    carried, floor_division, keys, header = FILL_LAYOUTS[tuple(names)]
+
+    if os.path.getsize(input_path) < PURE_PYTHON_BYTES and 'pandas' not in sys.modules:
+        input_data = read_raw_columns(input_path, names)
+        rows = fill_rows(input_data['Index'], input_data['Millis'],
+                         {key: input_data[column] for key, column in carried.items()},
+                         keys, floor_division=floor_division)
+        at_indicator = keys.index('Indicator')
+        total, received = len(rows), sum(row[at_indicator] for row in rows)
+    else:
+        from .loader import read_dataset
+
+        input_data = read_dataset(input_path, parse_times=False)
+        table = fill_gaps(input_data['Index'], input_data['Millis'],
+                          {key: input_data[column] for key, column in carried.items()},
+                          floor_division=floor_division)
+        rows = to_rows(table, keys)
+        total, received = len(table['Index']), int(table['Indicator'].sum())
+
+    with open(output_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return output_path, total, received
@@ -0,0 +1,353 @@
+"""
+Gap-fill engine shared by timing_analysis.py, test.py and data analysis.py.
+
+Takes the packets that were actually received and builds the dense table
+(one row per index from 1 to the highest index seen). Millis is linearly
+interpolated across gaps, every other column is copied forward from the
+last received packet and Indicator marks which rows were really received.
+
+fill_gaps() does it with NumPy; fill_rows() gives the same rows in plain
+Python for small captures, where importing NumPy would take longer than
+the fill. NumPy is only imported by the functions that use it.
+"""
+import csv
+import heapq
+
+from .instrument import traced
+
+
+@traced('gapfill', rows=lambda table: len(table['Index']))
+def fill_gaps(index, millis, columns=None, floor_division=False):
+    """
+    Gap-fills the received packets in one vectorized pass.
+
+    - 'index' and 'millis' are sequences of ints, one entry per received packet
+    - 'columns' is an optional dict of name -> sequence (DataRate, PowerLevel,
+      counter, the HH:MM:SS time, ...) that is copied forward into the gaps
+    - 'floor_division' interpolates with // like data analysis.py instead of
+      round() like timing_analysis.py and test.py
+    Returns a dict of NumPy arrays keyed 'Index', 'Millis', 'Indicator' plus
+    every name in 'columns'. Rows before the first received index have no
+    data; to_rows() writes them out blank.
+    """
+    import numpy as np
+
+    columns = columns or {}
+    index = np.asarray(index, dtype=np.int64)
+    millis = np.asarray(millis, dtype=np.int64)
+    values = {name: np.asarray(column) for name, column in columns.items()}
+
+    # Indices below 1 never made it into the old 1..max_index table
+    keep = index >= 1
+    if not keep.all():
+        index, millis = index[keep], millis[keep]
+        values = {name: column[keep] for name, column in values.items()}
+    if len(index) == 0:
+        table = {'Index': np.zeros(0, dtype=np.int64),
+                 'Millis': np.zeros(0, dtype=np.int64),
+                 'Indicator': np.zeros(0, dtype=np.uint8)}
+        table.update({name: column[:0] for name, column in values.items()})
+        return table
+
+    # A repeated index keeps its last packet, same as the old dict lookup
+    _, last = np.unique(index[::-1], return_index=True)
+    order = len(index) - 1 - last
+    known_index = index[order]
+    known_millis = millis[order]
+
+    max_index = int(known_index[-1])
+    full_index = np.arange(1, max_index + 1, dtype=np.int64)
+    indicator = np.zeros(max_index, dtype=np.uint8)
+    indicator[known_index - 1] = 1
+
+    # Previous and next received packet for every row
+    prev = np.searchsorted(known_index, full_index, side='right') - 1
+    np.maximum(prev, 0, out=prev)
+    nxt = np.minimum(prev + 1, len(known_index) - 1)
+
+    filled = known_millis[prev]
+    missing = (indicator == 0) & (full_index > known_index[0])
+    start = filled[missing]
+    end = known_millis[nxt[missing]]
+    step = full_index[missing] - known_index[prev[missing]]
+    gap = known_index[nxt[missing]] - known_index[prev[missing]]
+    if floor_division:
+        filled[missing] = start + ((end - start) * step) // gap
+    else:
+        # Same float expression as the old round() call, rint rounds half to even too
+        filled[missing] = np.rint(start + (end - start) * step / gap).astype(np.int64)
+
+    table = {'Index': full_index, 'Millis': filled, 'Indicator': indicator}
+    for name, column in values.items():
+        table[name] = column[order][prev]
+    return table
+
+
+def to_rows(table, keys):
+    """
+    Turns a fill_gaps() table into csv rows with the columns in 'keys' order.
+    Rows before the first received index are left blank (None), matching
+    what the old list-of-lists transform wrote.
+    """
+    import numpy as np
+
+    indicator = table['Indicator']
+    lead = int(np.argmax(indicator)) if len(indicator) else 0
+    columns = []
+    for key in keys:
+        values = table[key].tolist()
+        if key not in ('Index', 'Indicator'):
+            values[:lead] = [None] * lead
+        columns.append(values)
+    return zip(*columns)
+
+
+@traced('gapfill', rows=len)
+def fill_rows(index, millis, columns, keys, floor_division=False):
+    """
+    fill_gaps() followed by to_rows() in plain Python: the same rows value
+    for value (round() and // are what the NumPy version reproduces), as a
+    list. Arguments are those of the two functions.
+    """
+    # A repeated index keeps its last packet, indices below 1 are dropped
+    latest = {}
+    for row, (i, ms) in enumerate(zip(index, millis)):
+        if i >= 1:
+            latest[i] = (ms, row)
+    if not latest:
+        return []
+    known = sorted(latest)
+
+    # Row template: carried columns filled in per received packet, then
+    # Index / Millis / Indicator set per row
+    values = [columns[key] if key in columns else None for key in keys]
+    at_index = keys.index('Index')
+    at_indicator = keys.index('Indicator')
+    at_millis = keys.index('Millis') if 'Millis' in keys else None
+
+    # Rows before the first received index are blank apart from Index
+    rows = []
+    blank = [None] * len(keys)
+    blank[at_indicator] = 0
+    for i in range(1, known[0]):
+        blank[at_index] = i
+        rows.append(tuple(blank))
+
+    for a, b in zip(known, known[1:] + [None]):
+        start, row = latest[a]
+        template = [column[row] if column is not None else None for column in values]
+        template[at_index] = a
+        template[at_indicator] = 1
+        if at_millis is not None:
+            template[at_millis] = start
+        rows.append(tuple(template))
+        if b is None:
+            break
+
+        end = latest[b][0]
+        gap = b - a
+        template[at_indicator] = 0
+        for step in range(1, gap):
+            template[at_index] = a + step
+            if at_millis is not None:
+                if floor_division:
+                    template[at_millis] = start + ((end - start) * step) // gap
+                else:
+                    template[at_millis] = round(start + (end - start) * step / gap)
+            rows.append(tuple(template))
+    return rows
+
+
+RAW_KEYS = ['Index', 'Timestamp', 'Millis', 'DataRate', 'PowerLevel', 'Indicator']
+
+
+def read_raw_rows(path):
+    """
+    Reads a raw HH:MM:SS,Timestamp,Index,DataRate,PowerLevel capture one line
+    at a time, yielding (timestamp, millis, index, datarate, powerlevel).
+    A header row (readserial.py starting a new session) yields None; broken
+    lines are skipped.
+    """
+    with open(path, 'r', newline='') as csvfile:
+        for line in csvfile:
+            packet = parse_raw_line(line)
+            if packet is not False:
+                yield packet
+
+
+def parse_raw_line(line):
+    """
+    One raw capture line as (timestamp, millis, index, datarate, powerlevel),
+    None for a header row and False for a broken line.
+    """
+    parts = line.strip().split(',')
+    try:
+        timestamp, millis, index, datarate, powerlevel = parts
+        return timestamp, int(millis), int(index), int(datarate), int(powerlevel)
+    except ValueError:
+        return None if 'Index' in parts else False
+
+
+def _fill_chunk(anchor, batch, start=1):
+    """
+    Gap-fills one chunk of in-order packets, continuing on from 'anchor',
+    or starting at index 'start' when there is none.
+    """
+    import numpy as np
+
+    packets = [anchor] + batch if anchor else batch
+    # Shift indices so the arrays start at the anchor instead of at 1
+    base = anchor[2] - 1 if anchor else start - 1
+    timestamp, millis, index, datarate, powerlevel = zip(*packets)
+    table = fill_gaps(np.asarray(index, dtype=np.int64) - base, millis,
+                      {'Timestamp': timestamp,
+                       'DataRate': datarate,
+                       'PowerLevel': powerlevel})
+    table['Index'] += base
+    rows = list(to_rows(table, RAW_KEYS))
+    # The anchor row already went out with the previous chunk
+    return rows[1:] if anchor else rows
+
+
+def stream_fill(packets, chunk_size=100000, reorder=64, max_gap=1000000, anchor=None,
+                counts=None):
+    """
+    Streaming version of fill_gaps() for raw captures, in the test.py layout.
+
+    - 'packets' is an iterable of (timestamp, millis, index, datarate, powerlevel)
+      in roughly increasing index order, e.g. from read_raw_rows(); None
+      marks a header row, where a new session starts
+    - up to 'reorder' packets are held back so slightly out-of-order and
+      duplicate indices (last one wins) still land in the right place;
+      anything arriving after its slot was released is dropped
+    - a packet more than 'max_gap' indices past the previous one is a
+      corrupt index if it stands alone and is rejected, so it cannot blow
+      up the output; if the packet after it carries on from it, the index
+      really jumped (Teensy restart, capture starting late) and a new span
+      starts there without filling the gap
+    - a packet whose slot was written and which is more than 'reorder'
+      indices behind the packet before it is a new session if the packet
+      after it carries on from it (Teensy reset without a header
+      row, as sessions.session_rows() sees it), and rejected otherwise
+    - a new session, either way, is filled from index 1 again after the
+      rows of the one before
+    - 'anchor' is the last packet already written by an earlier run; filling
+      carries on after it instead of starting at index 1
+    - 'counts', a dict, gets the packets left out under 'rejected' (corrupt
+      indices), 'late' (their slot was already written) and the number of
+      new sessions started under 'sessions'
+    Yields lists of [Index, Timestamp, Millis, DataRate, PowerLevel, Indicator]
+    rows. Each chunk covers about 'chunk_size' indices plus at most one gap,
+    so memory stays bounded however long the capture is.
+    """
+    heap = []       # indices waiting in the reorder buffer
+    pending = {}    # index -> packet for everything in the heap
+    batch = []      # released packets not gap-filled yet
+    counts = counts if counts is not None else {}
+    for key in ('rejected', 'late', 'sessions'):
+        counts.setdefault(key, 0)
+    # 'anchor' is the last packet of the previous chunk
+    released = anchor[2] if anchor else 0  # highest index released from the reorder buffer
+    start = 1       # first index of the span when there is no anchor
+    behind = None   # packet far behind the one before it, until the next one says what it is
+    last_index = released  # index of the packet before, in arrival order
+
+    def release():
+        """Moves the lowest held packet into the batch; True when it starts a new span."""
+        nonlocal released
+        packet = pending.pop(heapq.heappop(heap))
+        jump = packet[2] - released > max_gap
+        if jump and not (heap and heap[0] - packet[2] <= max_gap):
+            # Nothing after it carries on from it: a corrupt index
+            counts['rejected'] += 1
+            return False
+        batch.append(packet)
+        released = packet[2]
+        return jump
+
+    def new_span():
+        """Sends out what came before a jump; the jumped-to packet starts the next span."""
+        nonlocal anchor, batch, start
+        if len(batch) > 1:
+            yield _fill_chunk(anchor, batch[:-1], start)
+        anchor, batch, start = None, batch[-1:], released
+
+    def new_session():
+        """Sends out everything held and starts over from index 1."""
+        nonlocal anchor, batch, start, released
+        while heap:
+            if release():
+                yield from new_span()
+        if batch:
+            yield _fill_chunk(anchor, batch, start)
+        if anchor or batch:
+            counts['sessions'] += 1
+        anchor, batch, start, released = None, [], 1, 0
+
+    def hold(packet):
+        index = packet[2]
+        if index not in pending:
+            heapq.heappush(heap, index)
+        pending[index] = packet
+
+    def span_start():
+        return anchor[2] if anchor else start - 1
+
+    for packet in packets:
+        if packet is None:
+            # Header row: the logger was restarted
+            if behind is not None:
+                counts['rejected'] += 1
+                behind = None
+            yield from new_session()
+            last_index = 0
+            continue
+        index = packet[2]
+        if behind is not None:
+            if behind[2] < index <= behind[2] + max_gap and index <= released:
+                # Carries on from it: the Teensy was reset
+                yield from new_session()
+                hold(behind)
+            else:
+                counts['rejected'] += 1
+            behind = None
+        previous, last_index = last_index, index
+        if index <= released:
+            if index < previous - reorder:
+                behind = packet
+            else:
+                # Late or duplicate packet whose slot has already been written
+                counts['late'] += 1
+            continue
+        hold(packet)
+        if len(heap) > reorder:
+            if release():
+                yield from new_span()
+            if released - span_start() >= chunk_size:
+                yield _fill_chunk(anchor, batch, start)
+                anchor, batch = batch[-1], []
+
+    if behind is not None:
+        counts['rejected'] += 1
+    while heap:
+        if release():
+            yield from new_span()
+    if batch:
+        yield _fill_chunk(anchor, batch, start)
+
+
+def stream_fill_file(input_path, output_path, **kwargs):
+    """
+    Gap-fills a raw capture into a ...new.csv chunk by chunk, without ever
+    holding the whole file in memory. Keyword arguments go to stream_fill()
+    ('counts' included, for the rejected packets). Returns the number of
+    rows written.
+    """
+    written = 0
+    with open(output_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(RAW_KEYS)
+        for chunk in stream_fill(read_raw_rows(input_path), **kwargs):
+            writer.writerows(chunk)
+            written += len(chunk)
+    return written
@@ -0,0 +1,137 @@
+"""
+Append-aware gap-filling for captures that keep growing.
+
+readserial.py appends to its CSV, so a file like antenna.csv picks up a
+new session every time it is run. update_fill() remembers how far it got:
+a checkpoint holds the byte offset of the last complete line read, the
+last packet written (the anchor the next run's gaps are filled from), the
+size of the output so far and running per-config totals. A re-run seeks
+straight to the offset, gap-fills just the appended lines and appends the
+new rows, so a "tail -f" style analysis costs time for the new data only.
+If the capture was rewritten or truncated, or the output doesn't match the
+checkpoint, it starts again from byte zero.
+"""
+import csv
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from .cache import CACHE_DIR
+from .gapfill import RAW_KEYS, parse_raw_line, stream_fill
+
+HEAD_BYTES = 4096  # start of the capture hashed to spot a rewritten file
+
+
+def checkpoint_path(output_path):
+    """Checkpoint file for an output, kept in the cache directory."""
+    output_path = Path(output_path).resolve()
+    digest = hashlib.sha1(str(output_path).encode()).hexdigest()[:12]
+    return CACHE_DIR / f"{output_path.stem}.{digest}.checkpoint.json"
+
+
+def _head_hash(path, limit):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(min(limit, HEAD_BYTES))).hexdigest()
+
+
+def _read_checkpoint(input_path, output_path):
+    """The saved checkpoint if it still lines up with both files, else None."""
+    try:
+        with open(checkpoint_path(output_path)) as f:
+            state = json.load(f)
+        if (state['input'] == str(Path(input_path).resolve())
+                and os.path.getsize(input_path) >= state['offset']
+                and _head_hash(input_path, state['offset']) == state['head_hash']
+                and os.path.getsize(output_path) == state['output_bytes']):
+            return state
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _new_packets(path, state):
+    """
+    Packets from the complete lines after state['offset'], moving the offset
+    along as lines are consumed. A line still being written is left for the
+    next run. Header rows come through as None and broken lines are
+    skipped, like read_raw_rows().
+    """
+    with open(path, 'rb') as f:
+        f.seek(state['offset'])
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            state['offset'] += len(line)
+            packet = parse_raw_line(line.decode('utf-8', 'replace'))
+            if packet is not False:
+                yield packet
+
+
+def _add_totals(totals, rows):
+    """Running rows / received per config, plus overall."""
+    for row in rows:
+        received = row[5]
+        totals['rows'] += 1
+        totals['received'] += received
+        if row[3] is None:
+            continue  # blank rows before the first received index
+        config = totals['configs'].setdefault(f'DR{row[3]}_PL{row[4]}', [0, 0])
+        config[0] += 1
+        config[1] += received
+
+
+def update_fill(input_path, output_path, **kwargs):
+    """
+    Brings a test.py-style ...new.csv up to date with its raw capture,
+    processing only what was appended since the last call.
+
+    Keyword arguments go to stream_fill(). Packets that arrive after their
+    index was already written by an earlier run are dropped, like late
+    packets within one run. Returns the checkpoint dict: offset, anchor,
+    output_bytes and the running totals (rows, received, configs as
+    {config: [rows, received]}) plus, for this call, 'new_rows' and
+    stream_fill()'s counts: 'rejected', 'late' and 'sessions' (new sessions
+    appended to the capture, each filled from index 1 again).
+    """
+    state = _read_checkpoint(input_path, output_path)
+    resumed = state is not None
+    if not resumed:
+        state = {
+            'input': str(Path(input_path).resolve()),
+            'offset': 0,
+            'anchor': None,
+            'totals': {'rows': 0, 'received': 0, 'configs': {}},
+        }
+
+    new_rows = 0
+    counts = {}
+    anchor = state['anchor']
+    with open(output_path, 'a' if resumed else 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        if not resumed:
+            writer.writerow(RAW_KEYS)
+        for chunk in stream_fill(_new_packets(input_path, state), anchor=anchor,
+                                 counts=counts, **kwargs):
+            writer.writerows(chunk)
+            _add_totals(state['totals'], chunk)
+            new_rows += len(chunk)
+            last = chunk[-1]  # always a received packet
+            anchor = [last[1], last[2], last[0], last[3], last[4]]
+
+    state['anchor'] = anchor
+    state['head_hash'] = _head_hash(input_path, state['offset'])
+    state['output_bytes'] = os.path.getsize(output_path)
+
+    path = checkpoint_path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+    state['new_rows'] = new_rows
+    for key in ('rejected', 'late', 'sessions'):
+        state[key] = counts.get(key, 0)
+    state['resumed'] = resumed
+    return state
@@ -0,0 +1,211 @@
+"""
+Stage timers and counters for the analysis pipeline.
+
+The library wraps its stages (load, parse timestamps, gap-fill, aggregate,
+save) with stage() or @traced, recording wall time, rows processed and the
+process's peak RSS. Everything is off unless LINKTEST_TRACE is set (to an
+output .json path, or 1 for linktest_trace_<pid>.json) or enable() is
+called, e.g. by a --trace flag. While off, stage() hands back one shared
+do-nothing object and @traced adds a single flag check, so the hooks can
+stay in the hot paths.
+
+The trace is written at exit in Chrome trace format: open it in
+chrome://tracing or ui.perfetto.dev to see each stage per process and
+worker. A per-stage summary (calls, seconds, rows) is printed and stored
+alongside the events. run_batch() ships stages recorded in worker processes
+back to the parent, so one file covers the whole batch.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENABLED = False
+TRACE_PATH = None
+
+_events = []
+_counters = defaultdict(int)
+_lock = threading.Lock()
+
+
+def peak_rss_mb():
+    """High-water mark of this process's resident memory, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+class _NullStage:
+    """What stage() returns while tracing is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_rows(self, rows):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """One timed stage; set_rows() records how many rows it handled."""
+    __slots__ = ('name', 'rows', 'args', '_start')
+
+    def __init__(self, name, rows=None, **args):
+        self.name = name
+        self.rows = rows
+        self.args = args
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        args = dict(self.args)
+        if self.rows is not None:
+            args['rows'] = int(self.rows)
+        args['peak_rss_mb'] = peak_rss_mb()
+        event = {'name': self.name, 'ph': 'X', 'ts': self._start / 1000,
+                 'dur': (end - self._start) / 1000, 'pid': os.getpid(),
+                 'tid': threading.get_ident(), 'args': args}
+        with _lock:
+            _events.append(event)
+        return False
+
+    def set_rows(self, rows):
+        self.rows = rows
+
+
+def stage(name, rows=None, **args):
+    """
+    Context manager timing one pipeline stage:
+
+        with stage('gapfill') as s:
+            ...
+            s.set_rows(len(table))
+
+    Extra keyword arguments are stored with the event (file names...).
+    """
+    if not ENABLED:
+        return _NULL_STAGE
+    return Stage(name, rows, **args)
+
+
+def traced(name, rows=None, input_rows=False):
+    """
+    Decorator form of stage(). 'rows', if given, is called with the
+    function's result to get the rows processed; 'input_rows' counts the
+    rows of the first argument instead.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with Stage(name) as timed:
+                if input_rows:
+                    timed.set_rows(len(args[0]))
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    timed.set_rows(rows(result))
+            return result
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Adds 'n' to a named counter (cache hits, dropped lines...)."""
+    if ENABLED:
+        with _lock:
+            _counters[name] += n
+
+
+def drain():
+    """Takes the events and counters recorded so far (for shipping between processes)."""
+    global _counters
+    with _lock:
+        events = _events[:]
+        _events.clear()
+        counters, _counters = dict(_counters), defaultdict(int)
+    return events, counters
+
+
+def merge(recorded):
+    """Adds events and counters from drain() in another process."""
+    events, counters = recorded
+    with _lock:
+        _events.extend(events)
+        for name, n in counters.items():
+            _counters[name] += n
+
+
+def summary():
+    """Per-stage totals: {name: {'calls', 'seconds', 'rows'}}."""
+    totals = {}
+    with _lock:
+        for event in _events:
+            total = totals.setdefault(event['name'], {'calls': 0, 'seconds': 0.0, 'rows': 0})
+            total['calls'] += 1
+            total['seconds'] += event['dur'] / 1e6
+            total['rows'] += event['args'].get('rows', 0)
+    return totals
+
+
+def write_trace(path=None):
+    """Writes the Chrome trace (plus summary and counters) and prints the summary."""
+    path = path or TRACE_PATH
+    totals = summary()
+    with _lock:
+        trace = {'traceEvents': list(_events), 'displayTimeUnit': 'ms',
+                 'summary': totals, 'counters': dict(_counters),
+                 'peak_rss_mb': peak_rss_mb()}
+    with open(path, 'w') as f:
+        json.dump(trace, f)
+
+    print(f"\nStage timings (trace saved to '{path}'):")
+    for name, total in sorted(totals.items(), key=lambda item: -item[1]['seconds']):
+        rate = f"{total['rows'] / total['seconds']:,.0f} rows/s" if total['rows'] else ''
+        print(f"  {name:>28}: {total['seconds']:8.3f} s in {total['calls']} calls  {rate}")
+    for name, n in sorted(_counters.items()):
+        print(f"  {name:>28}: {n}")
+
+
+def enable(path=None):
+    """Turns tracing on for this process; the trace is written to 'path' at exit."""
+    global ENABLED, TRACE_PATH
+    if not ENABLED:
+        atexit.register(_write_at_exit, os.getpid())
+    ENABLED = True
+    TRACE_PATH = path or TRACE_PATH or f"linktest_trace_{os.getpid()}.json"
+    # Worker processes started from here inherit the switch
+    os.environ['LINKTEST_TRACE'] = TRACE_PATH
+
+
+def _write_at_exit(pid):
+    # Forked workers inherit the handler; only the process that enabled it writes
+    if os.getpid() == pid and _events:
+        write_trace()
+
+
+_setting = os.environ.get('LINKTEST_TRACE', '')
+if _setting not in ('', '0'):
+    ENABLED = True
+    TRACE_PATH = _setting if _setting.endswith('.json') else f"linktest_trace_{os.getpid()}.json"
+    atexit.register(_write_at_exit, os.getpid())
@@ -0,0 +1,79 @@
+"""
+Works out which logger wrote a CSV from its first few kilobytes.
+
+Kept apart from loader.py and free of NumPy/pandas so the capture and
+gap-fill paths can check a file's layout without paying for those imports.
+"""
+from collections import Counter
+
+# Raw log columns by number of fields per line
+RAW_COLUMNS = {
+    2: ['Millis', 'Index'],
+    3: ['Timestamp', 'Millis', 'Index'],
+    5: ['Timestamp', 'Millis', 'Index', 'DataRate', 'PowerLevel'],
+    6: ['Timestamp', 'Millis', 'Index', 'DataRate', 'PowerLevel', 'counter'],
+}
+
+SNIFF_BYTES = 4096
+
+# Processed datasets packed by linktest.packed
+PACKED_SUFFIX = '.rle'
+
+# Every letter as 'A', for finding the header rows among the digits of a raw log
+LETTERS = bytes.maketrans(bytes(range(65, 91)) + bytes(range(97, 123)), b'A' * 52)
+
+
+def sniff_layout(path):
+    """
+    Works out the layout of 'path' from its first few kilobytes.
+    Returns (layout, names) where layout is 'raw', 'processed', 'can' or
+    None for an empty file, and names are the columns to read raw logs with.
+    Packed files are processed datasets.
+    """
+    if str(path).endswith(PACKED_SUFFIX):
+        return 'processed', None
+    with open(path, 'r', newline='') as f:
+        head = f.read(SNIFF_BYTES)
+    lines = head.splitlines()
+    if len(head) == SNIFF_BYTES and len(lines) > 1:
+        lines = lines[:-1]  # last line is probably cut short
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return None, None
+
+    first = lines[0].split(',')
+    if len(first) == 1 and 'ID' in lines[0].split():
+        return 'can', None
+    if first[0].strip() == 'Index':
+        return 'processed', None
+
+    # Everything else is a raw log; go by the usual number of fields per line
+    # since the header rows don't always match the data (triple250kbps.csv)
+    fields = Counter(len(line.split(',')) for line in lines).most_common(1)[0][0]
+    if fields not in RAW_COLUMNS:
+        raise ValueError(f"Unrecognised layout in {path}: {lines[0]!r}")
+    return 'raw', RAW_COLUMNS[fields]
+
+
+def header_lines(path):
+    """
+    Line numbers (from 0, blank lines counted) of the lines in 'path' with
+    letters in them: the header rows readserial.py writes at the start of
+    each session. Found with bytes methods over the whole file rather than
+    a Python loop per line, ready for pd.read_csv(skiprows=...).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    marked = data.translate(LETTERS)
+    lines, line, counted = [], 0, 0
+    position = marked.find(b'A')
+    while position >= 0:
+        start = data.rfind(b'\n', 0, position) + 1
+        line += data.count(b'\n', counted, start)
+        counted = start
+        lines.append(line)
+        end = data.find(b'\n', position)
+        if end < 0:
+            break
+        position = marked.find(b'A', end)
+    return lines
@@ -0,0 +1,191 @@
+"""
+Live link-quality metrics computed while capture() is logging.
+
+Every packet line updates per-config counters in O(1): cumulative and
+rolling success rate, rolling packets per second, a gap-length histogram
+and the DataRate/PowerLevel currently being received. The numbers show up
+on the capture status line and as JSON from a small local HTTP server, so
+a bad window is spotted in the field instead of after the walk back.
+"""
+import json
+import threading
+from collections import deque
+
+# Gap lengths are bucketed by powers of two: 1, 2-3, 4-7, ... 1024+
+GAP_BUCKETS = 12
+GAP_LABELS = ['1'] + [f'{1 << b}-{(1 << (b + 1)) - 1}' for b in range(1, GAP_BUCKETS - 1)] \
+    + [f'{1 << (GAP_BUCKETS - 1)}+']
+
+
+class _ConfigStats:
+    __slots__ = ('received', 'expected', 'gaps', 'window')
+
+    def __init__(self):
+        self.received = 0
+        self.expected = 0
+        self.gaps = [0] * GAP_BUCKETS
+        self.window = deque()  # (millis, index) of packets in the rolling window
+
+
+class LiveMetrics:
+    """
+    Rolling per-config metrics fed one packet at a time.
+
+    - 'window_ms' is the rolling window length on the Teensy's millis clock
+    Safe to read from the HTTP thread while the capture thread updates it.
+    """
+
+    def __init__(self, window_ms=5000):
+        self.window_ms = window_ms
+        self.configs = {}
+        self.current = None
+        self.packets = 0
+        self.bad_lines = 0
+        self._last_index = None
+        self._lock = threading.Lock()
+
+    def update(self, millis, index, datarate, powerlevel):
+        """Adds one received packet."""
+        with self._lock:
+            key = (datarate, powerlevel)
+            stats = self.configs.get(key)
+            if stats is None:
+                stats = self.configs[key] = _ConfigStats()
+            self.current = key
+            self.packets += 1
+
+            window = stats.window
+            if self._last_index is not None and index > self._last_index:
+                gap = index - self._last_index - 1
+            else:
+                # First packet, or the index went back (new session): start over
+                gap = 0
+                window.clear()
+            self._last_index = index
+
+            stats.received += 1
+            stats.expected += gap + 1
+            if gap:
+                stats.gaps[min(gap.bit_length(), GAP_BUCKETS) - 1] += 1
+
+            window.append((millis, index))
+            while window[0][0] < millis - self.window_ms:
+                window.popleft()
+
+    def feed(self, rows):
+        """
+        capture() on_lines callback: parses (HH:MM:SS, 'millis,index,datarate,
+        powerlevel[,counter]') pairs and updates the metrics.
+        """
+        for _, line in rows:
+            try:
+                millis, index, datarate, powerlevel = line.split(',')[:4]
+                self.update(int(millis), int(index), int(datarate), int(powerlevel))
+            except ValueError:
+                self.bad_lines += 1
+
+    @staticmethod
+    def _rolling(window):
+        """(success rate %, packets per second) over a config's window."""
+        if len(window) < 2:
+            return 100.0 if window else 0.0, 0.0
+        span_index = window[-1][1] - window[0][1] + 1
+        span_ms = window[-1][0] - window[0][0]
+        success = 100.0 * len(window) / span_index if span_index > 0 else 0.0
+        pps = 1000.0 * (len(window) - 1) / span_ms if span_ms > 0 else 0.0
+        return success, pps
+
+    def snapshot(self):
+        """Current metrics as a JSON-ready dict."""
+        with self._lock:
+            configs = {}
+            for (datarate, powerlevel), stats in self.configs.items():
+                success, pps = self._rolling(stats.window)
+                configs[f'DR{datarate}_PL{powerlevel}'] = {
+                    'received': stats.received,
+                    'expected': stats.expected,
+                    'success_rate': 100.0 * stats.received / stats.expected,
+                    'rolling_success_rate': success,
+                    'rolling_pps': pps,
+                    'gap_histogram': {label: count for label, count
+                                      in zip(GAP_LABELS, stats.gaps) if count},
+                }
+            current = self.current
+            return {
+                'current': f'DR{current[0]}_PL{current[1]}' if current else None,
+                'packets': self.packets,
+                'bad_lines': self.bad_lines,
+                'window_ms': self.window_ms,
+                'configs': configs,
+            }
+
+    def status_line(self):
+        """Short summary of the current config for the console."""
+        with self._lock:
+            if self.current is None:
+                return 'no packets yet'
+            stats = self.configs[self.current]
+            success, pps = self._rolling(stats.window)
+        return (f"DR{self.current[0]}_PL{self.current[1]}: "
+                f"{success:.1f}% success, {pps:.0f} pps")
+
+
+class MetricsServer:
+    """
+    Serves metrics.snapshot() as JSON on http://host:port/ from a daemon
+    thread. http.server (and the ssl/email modules it drags in) is imported
+    on that thread, so a capture started straight afterwards doesn't wait
+    for it. A port that can't be opened is reported instead of raised.
+    """
+
+    def __init__(self, metrics, port=8765, host='127.0.0.1'):
+        self.metrics = metrics
+        self.address = (host, port)
+        self.server = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(metrics.snapshot(), indent=1).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep the capture console quiet
+
+        try:
+            self.server = ThreadingHTTPServer(self.address, Handler)
+        except OSError as e:
+            print(f"Live metrics not served on port {self.address[1]}: {e}")
+            return
+        finally:
+            self._ready.set()
+        self.server.serve_forever()
+
+    def wait_ready(self, timeout=None):
+        """Waits until the server is listening (or failed to); True if it is."""
+        self._ready.wait(timeout)
+        return self.server is not None
+
+    def shutdown(self):
+        """Stops the server."""
+        if self.wait_ready():
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def serve_metrics(metrics, port=8765, host='127.0.0.1'):
+    """
+    Starts a MetricsServer for 'metrics' and returns it straight away;
+    call shutdown() on it to stop.
+    """
+    return MetricsServer(metrics, port, host)
@@ -0,0 +1,154 @@
+"""
+Schema-sniffing loader for every CSV layout in the repo.
+
+Looks at the first few kilobytes of a file to work out which logger wrote
+it, then hands the whole file to the pandas C parser in one call. Repeated
+header rows (readserial.py writes one per session) are skipped by line
+number so the columns parse straight to ints; files with truncated lines
+fall back to vectorized numeric coercion instead of a try/except per row.
+
+Layouts understood:
+- Timestamp,Index                       13022025, Timestamp is Teensy millis
+- Timestamp,Millis,Index                27022025 / 28022025
+- HH:MM:SS,Timestamp,Index,DataRate,PowerLevel        19032025/csv, headerless
+- CurrentTime,Timestamp,Index,DataRate,PowerLevel,counter   Week 9 combined
+- Index,...,Indicator                   processed ...new.csv outputs
+- Timestamp ID Value1..4 Byte1..4       Live DTI CAN logs, space separated
+Raw logs come back with the column names test.py writes (Timestamp for the
+host HH:MM:SS time, Millis for the Teensy clock) plus counter when logged.
+Processed and CAN files keep their own header names.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .instrument import stage, traced
+from .layout import (PACKED_SUFFIX, RAW_COLUMNS,  # noqa: F401  (RAW_COLUMNS used to live here)
+                     header_lines, sniff_layout)
+
+# Narrowest type that holds every value we log for each column
+INT_COLUMNS = {
+    'Index': np.int32,
+    'Millis': np.int32,
+    'Timestamp_ms': np.int32,
+    'DataRate': np.uint16,
+    'PowerLevel': np.uint8,
+    'counter': np.uint8,
+    'Indicator': np.uint8,
+}
+
+# Nullable versions for columns with blanks
+NULLABLE = {np.int32: 'Int32', np.uint16: 'UInt16', np.uint8: 'UInt8'}
+
+# Host clock columns logged by readserial.py as HH:MM:SS
+TIME_COLUMNS = ('Timestamp', 'CurrentTime')
+
+# CAN log columns written as hex
+CAN_HEX_COLUMNS = ['ID', 'Value1', 'Value2', 'Value3', 'Value4',
+                   'Byte1', 'Byte2', 'Byte3', 'Byte4']
+
+
+def _narrow(values, dtype):
+    """Casts one numeric column to 'dtype' if every value fits."""
+    info = np.iinfo(dtype)
+    if values.min() < info.min or values.max() > info.max:
+        return values
+    if values.isna().any():
+        return values.astype(NULLABLE[dtype])
+    return values.astype(dtype)
+
+
+def narrow_types(df, parse_times=True):
+    """
+    Converts the known columns of a freshly parsed frame to their compact
+    types in place and returns it. A column with blanks (the rows before the
+    first received index) gets the matching nullable type instead, and
+    values that don't fit the narrow type leave the column as parsed.
+    HH:MM:SS columns become datetimes unless 'parse_times' is False.
+    """
+    for column in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[column]) or df[column].empty:
+            continue
+        if column in INT_COLUMNS:
+            df[column] = _narrow(df[column], INT_COLUMNS[column])
+        elif column in TIME_COLUMNS:
+            # 13022025-style processed files put the Teensy millis in Timestamp
+            df[column] = _narrow(df[column], np.int32)
+    if parse_times:
+        for column in TIME_COLUMNS:
+            if column in df and pd.api.types.is_string_dtype(df[column]):
+                with stage('parse timestamps', rows=len(df)):
+                    df[column] = pd.to_datetime(df[column], format='%H:%M:%S')
+    return df
+
+
+def _parse_hex(column):
+    """Hex strings to ints, converting each distinct value only once."""
+    codes, uniques = pd.factorize(column)
+    values = np.array([int(str(u), 16) for u in uniques], dtype=np.int64)
+    return values[codes]
+
+
+@traced('load', rows=len)
+def read_dataset(path, parse_times=True):
+    """
+    Reads any link-test or CAN CSV into a typed DataFrame.
+
+    - raw logs: header rows, truncated lines and rows with junk fields are
+      dropped, the rest come back in file order
+    - processed files: read as is, packed ones (linktest.packed) included
+    - CAN logs: ID and payload columns are converted from hex
+    'parse_times' is passed on to narrow_types(); gap-filling keeps the
+    HH:MM:SS strings so they can be written back out unchanged.
+    """
+    layout, names = sniff_layout(path)
+    if layout is None:
+        return pd.DataFrame()
+
+    if layout == 'processed' and str(path).endswith(PACKED_SUFFIX):
+        from .packed import read_packed
+
+        df = read_packed(path)
+    elif layout == 'processed':
+        df = pd.read_csv(path)
+    elif layout == 'can':
+        df = pd.read_csv(path, sep=r'\s+', dtype=str)
+        df['Timestamp'] = pd.to_numeric(df['Timestamp'])
+        for column in CAN_HEX_COLUMNS:
+            df[column] = _parse_hex(df[column])
+        return df
+    else:
+        df = _read_raw(path, names)
+    return narrow_types(df, parse_times=parse_times)
+
+
+def _read_raw(path, names):
+    """
+    A raw log with columns 'names'. The header rows are skipped by line
+    number so the rest parses straight to int64; only a file with cut short
+    lines or junk in a field goes through the slower string coercion.
+    """
+    numeric = [name for name in names if name != 'Timestamp']
+    try:
+        return pd.read_csv(path, header=None, names=names, skiprows=header_lines(path),
+                           dtype=dict.fromkeys(numeric, np.int64), on_bad_lines='skip')
+    except ValueError:
+        pass  # a blank or non-integer field somewhere
+
+    with warnings.catch_warnings():
+        # A header row makes its chunk's columns strings while the rest
+        # parse as ints; the coercion below sorts out the mixed columns
+        warnings.simplefilter('ignore', pd.errors.DtypeWarning)
+        df = pd.read_csv(path, header=None, names=names, on_bad_lines='skip')
+    for name in numeric:
+        # Only columns with header rows or junk in them fall back to strings
+        if not pd.api.types.is_numeric_dtype(df[name]):
+            df[name] = pd.to_numeric(df[name], errors='coerce')
+    # Header rows and short lines have a blank or non-numeric field
+    bad = df[numeric].isna().any(axis=1)
+    if bad.any():
+        df = df[~bad].reset_index(drop=True)
+        for name in numeric:
+            df[name] = df[name].astype(np.int64)
+    return df
@@ -0,0 +1,167 @@
+"""
+Per-configuration link metrics in one grouped pass.
+
+Every DataRate x PowerLevel combination gets a small integer code, and the
+success rate, packets per second, per-second counts and time delay stats
+for all of them come out of a single groupby on those codes instead of
+re-filtering the frame once per config and per plot. Each function returns
+a tidy table with a 'Config' column ('DR{rate}_PL{level}') for the plots
+and reports to pick lines out of.
+"""
+import numpy as np
+import pandas as pd
+
+from .instrument import traced
+
+
+def config_codes(df):
+    """
+    Integer code per row for its DataRate x PowerLevel config.
+    Returns (codes, labels): codes follow the order each config first
+    appears in, labels[code] is 'DR{rate}_PL{level}'. Rows without a config
+    (blank rows before the first received index) get -1.
+    """
+    rate = df['DataRate'].to_numpy(dtype=np.float64, na_value=np.nan)
+    level = df['PowerLevel'].to_numpy(dtype=np.float64, na_value=np.nan)
+    key = rate * 256 + level
+    codes, uniques = pd.factorize(key, use_na_sentinel=True)
+    labels = [f'DR{int(u) // 256}_PL{int(u) % 256}' for u in uniques]
+    return codes, labels
+
+
+def config_labels(df):
+    """'DR{rate}_PL{level}' for every row as a Categorical, one label per config."""
+    codes, labels = config_codes(df)
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+
+def standard_columns(df):
+    """
+    Week 9 processed files name the Teensy clock Timestamp_ms and the host
+    time CurrentTime; renames them to Millis and Timestamp so the functions
+    here work on both layouts. Other frames are returned as they are.
+    """
+    renames = {old: new for old, new in (('Timestamp_ms', 'Millis'), ('CurrentTime', 'Timestamp'))
+               if old in df and new not in df}
+    return df.rename(columns=renames) if renames else df
+
+
+def _label(table, codes_column, labels):
+    """Swaps the integer code column of a grouped table for the config label."""
+    table.insert(0, 'Config', np.asarray(labels, dtype=object)[table.pop(codes_column)])
+    return table
+
+
+@traced('aggregate: bin_metrics', input_rows=True)
+def bin_metrics(df, bin_size=100, time_column='Millis', by_config=True):
+    """
+    Success rate and packets per second in 'bin_size' ms bins.
+
+    Columns: Config (only with 'by_config'), Bin, bin_start, count,
+    successes, success_rate (%), packets_per_second. Rows are in config
+    order, then bin order.
+    """
+    codes, labels = config_codes(df) if by_config else (np.zeros(len(df), dtype=np.intp), [])
+    keep = codes >= 0
+    times = df[time_column].to_numpy()[keep]
+    grouped = pd.DataFrame({
+        'code': codes[keep],
+        'Bin': (times // bin_size).astype(np.int64),
+        'Indicator': df['Indicator'].to_numpy()[keep],
+    }).groupby(['code', 'Bin'], sort=True).agg(
+        count=('Indicator', 'size'),
+        successes=('Indicator', 'sum')
+    ).reset_index()
+    grouped['bin_start'] = grouped['Bin'] * bin_size
+    grouped['success_rate'] = (grouped['successes'] / grouped['count']) * 100
+    grouped['packets_per_second'] = grouped['successes'] * (1000 / bin_size)
+    grouped = grouped[['code', 'Bin', 'bin_start', 'count', 'successes',
+                       'success_rate', 'packets_per_second']]
+    if not by_config:
+        return grouped.drop(columns='code')
+    return _label(grouped, 'code', labels)
+
+
+@traced('aggregate: second_counts', input_rows=True)
+def second_counts(df, time_column='Timestamp'):
+    """
+    Rows logged in each host-clock second, counted from the first second
+    each config was seen. Columns: Config, ElapsedSeconds, packets.
+    """
+    codes, labels = config_codes(df)
+    keep = codes >= 0
+    frame = pd.DataFrame({'code': codes[keep], 'time': df[time_column].to_numpy()[keep]})
+    start = frame.groupby('code')['time'].transform('min')
+    frame['ElapsedSeconds'] = (frame['time'] - start).dt.total_seconds()
+    grouped = frame.groupby(['code', 'ElapsedSeconds'], sort=True).agg(
+        packets=('time', 'size')
+    ).reset_index()
+    return _label(grouped, 'code', labels)
+
+
+@traced('aggregate: delay_table', input_rows=True)
+def delay_table(df, time_column='Timestamp', millis_column='Millis'):
+    """
+    Host clock minus Teensy clock for every row, each measured from the
+    first row of its config. Columns: Config, Index, TimeDelay (ms).
+    """
+    codes, labels = config_codes(df)
+    keep = codes >= 0
+    frame = pd.DataFrame({
+        'code': codes[keep],
+        'Index': df['Index'].to_numpy()[keep],
+        'time': df[time_column].to_numpy()[keep],
+        # Blank rows before the first received index have no config and are masked out
+        'millis': df[millis_column].to_numpy(dtype=np.int64, na_value=0)[keep],
+        'row': np.flatnonzero(keep),
+    })
+    by_code = frame.groupby('code')
+    time_elapsed = (frame['time'] - by_code['time'].transform('min')).dt.total_seconds() * 1000
+    millis_elapsed = frame['millis'] - by_code['millis'].transform('min')
+    frame['TimeDelay'] = time_elapsed - millis_elapsed
+    frame = frame.sort_values(['code', 'row'], kind='stable')
+    return _label(frame[['code', 'row', 'Index', 'TimeDelay']].reset_index(drop=True),
+                  'code', labels)
+
+
+@traced('aggregate: delay_bins', input_rows=True)
+def delay_bins(df, points=100, **columns):
+    """
+    delay_table() averaged over blocks of 'points' rows of the file (Teensy
+    minus host, the sign the averaged plot uses). Columns: Config,
+    bin_index (mean Index of the block), avg_delay.
+    """
+    delays = delay_table(df, **columns)
+    codes, labels = pd.factorize(delays['Config'])
+    grouped = pd.DataFrame({
+        'code': codes,
+        'DelayBin': delays['row'].to_numpy() // points,
+        'delay': -delays['TimeDelay'].to_numpy(),
+        'Index': delays['Index'].to_numpy(),
+    }).groupby(['code', 'DelayBin'], sort=True).agg(
+        avg_delay=('delay', 'mean'),
+        bin_index=('Index', 'mean')
+    ).reset_index()
+    return _label(grouped[['code', 'DelayBin', 'bin_index', 'avg_delay']], 'code', labels)
+
+
+@traced('aggregate: config_summary', input_rows=True)
+def config_summary(df, bin_size=100):
+    """
+    One row per config for reports: rows, successes, success_rate (%),
+    mean/max packets per second over the 'bin_size' bins and the delay
+    spread (p50/p95 of Teensy minus host, ms) when a host clock was logged.
+    """
+    bins = bin_metrics(df, bin_size=bin_size)
+    summary = bins.groupby('Config', sort=False).agg(
+        rows=('count', 'sum'),
+        successes=('successes', 'sum'),
+        pps_mean=('packets_per_second', 'mean'),
+        pps_max=('packets_per_second', 'max'),
+    )
+    summary['success_rate'] = summary['successes'] / summary['rows'] * 100
+    if 'Timestamp' in df and pd.api.types.is_datetime64_any_dtype(df['Timestamp']):
+        delays = delay_table(df).groupby('Config', sort=False)['TimeDelay']
+        summary['delay_p50'] = -delays.quantile(0.5)
+        summary['delay_p95'] = -delays.quantile(0.05)
+    return summary.reset_index()
@@ -0,0 +1,259 @@
+"""
+Run-length packed storage for processed (...new.csv) datasets.
+
+A gap-filled file is mostly repeats: DataRate, PowerLevel, counter and
+Indicator stay the same for thousands of rows, Index goes up by one every
+row and HH:MM:SS changes once a second. pack_csv() stores each column the
+way it compresses best and writes them as one compressed .npz archive
+(PACKED_SUFFIX, next to the CSV by default):
+
+- 'steps': the rows where the value changes and the new values - config
+  columns, counter, Indicator (its steps are the received index ranges)
+  and the HH:MM:SS strings, numbered through a table of distinct values
+- 'delta steps': steps of the row-to-row differences - Index
+- 'delta': every difference, in the narrowest integer type - Millis
+Blanks (the rows before the first received index) are steps of their own.
+The packing is checked by writing the CSV back out and comparing bytes,
+so unpack_csv() gives the original file exactly.
+
+read_dataset() and sniff_layout() take packed files like processed CSVs,
+so metrics, plots, windows and the distance report read them as they are;
+PackedDataset decodes single columns for code that only needs a few.
+"""
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .layout import PACKED_SUFFIX
+
+FORMAT_VERSION = 1
+LINE_TERMINATORS = ('\r\n', '\n')
+
+
+def default_packed(csv_path):
+    """'<name>.rle' next to the CSV."""
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + PACKED_SUFFIX)
+
+
+def _narrow(values):
+    """'values' in the smallest signed integer type that holds them."""
+    if len(values) == 0:
+        return values.astype(np.int8)
+    low, high = int(values.min()), int(values.max())
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+
+def _steps(values):
+    """(rows where the value changes, the values from there on); row 0 always included."""
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64), values
+    rows = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    return rows, values[rows]
+
+
+def _expand(rows, values, length):
+    """Inverse of _steps() for a column of 'length' rows."""
+    return np.repeat(values, np.diff(np.r_[rows, length]))
+
+
+def _encode_ints(values):
+    """
+    The smallest of the 'steps', 'delta steps' and 'delta' encodings of an
+    int64 column, as (encoding, {suffix: array}).
+    """
+    delta = np.diff(values, prepend=0)  # first entry is the first value
+    rows, steps = _steps(values)
+    delta_rows, delta_steps = _steps(delta)
+    options = [
+        ('steps', {'rows': _narrow(rows), 'values': _narrow(steps)}),
+        ('delta steps', {'rows': _narrow(delta_rows), 'values': _narrow(delta_steps)}),
+        ('delta', {'values': _narrow(delta)}),
+    ]
+    return min(options, key=lambda option: sum(a.nbytes for a in option[1].values()))
+
+
+def _decode_ints(encoding, arrays, length):
+    values = arrays['values'].astype(np.int64)
+    if encoding == 'delta':
+        return np.cumsum(values)
+    rows = arrays['rows'].astype(np.int64)
+    if encoding == 'delta steps':
+        return np.cumsum(_expand(rows, values, length))
+    return _expand(rows, values, length)
+
+
+def _is_canonical_int(text):
+    """Integer values of a string column, or None unless every non-blank one is a plain integer."""
+    values = pd.to_numeric(text, errors='coerce')
+    if values.isna().any():
+        return None
+    values = values.to_numpy()
+    if values.dtype.kind not in 'iu':
+        return None
+    values = values.astype(np.int64)
+    # '007' or '+7' would come back as '7'
+    if not (values.astype(str) == text.to_numpy(dtype=str)).all():
+        return None
+    return values
+
+
+def encode_frame(text):
+    """
+    Packed arrays for a frame of CSV fields as strings ('' for blanks),
+    as a dict ready for np.savez_compressed.
+    """
+    arrays = {'columns': np.array(list(text.columns), dtype=str),
+              'rows': np.array([len(text)], dtype=np.int64)}
+    kinds, encodings = [], []
+    for number, name in enumerate(text.columns):
+        column = text[name]
+        blank = (column == '').to_numpy()
+        if blank.any():
+            rows, values = _steps(blank)
+            arrays[f'c{number}_blank_rows'] = _narrow(rows)
+            arrays[f'c{number}_blank_values'] = values
+
+        filled = column[~blank]
+        values = _is_canonical_int(filled)
+        if values is not None:
+            kinds.append('int')
+        else:
+            codes, uniques = pd.factorize(filled)
+            values = codes.astype(np.int64)
+            arrays[f'c{number}_table'] = np.asarray(uniques, dtype=str)
+            kinds.append('text')
+        # Blank rows take the next value so they don't add steps of their own
+        full = np.zeros(len(column), dtype=np.int64)
+        if len(values):
+            full[~blank] = values
+            last_filled = np.maximum.accumulate(np.where(~blank, np.arange(len(full)), -1))
+            first = np.flatnonzero(~blank)[0]
+            full = full[np.where(last_filled >= 0, last_filled, first)]
+        encoding, parts = _encode_ints(full)
+        encodings.append(encoding)
+        for suffix, part in parts.items():
+            arrays[f'c{number}_{suffix}'] = part
+    arrays['kinds'] = np.array(kinds, dtype=str)
+    arrays['encodings'] = np.array(encodings, dtype=str)
+    return arrays
+
+
+class PackedDataset:
+    """
+    A packed file, decoded a column at a time. 'columns' are the CSV
+    header names and 'rows' the number of data rows.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with np.load(self.path, allow_pickle=False) as archive:
+            self._arrays = {key: archive[key] for key in archive.files}
+        if int(self._arrays['version'][0]) != FORMAT_VERSION:
+            raise ValueError(f"{self.path.name}: unknown packed format "
+                             f"{int(self._arrays['version'][0])}")
+        self.columns = [str(name) for name in self._arrays['columns']]
+        self.rows = int(self._arrays['rows'][0])
+        self.line_terminator = str(self._arrays['line_terminator'][0])
+
+    def nbytes(self):
+        """Memory held by the packed arrays."""
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def _blank(self, number):
+        rows = self._arrays.get(f'c{number}_blank_rows')
+        if rows is None:
+            return None
+        return _expand(rows.astype(np.int64), self._arrays[f'c{number}_blank_values'], self.rows)
+
+    def column(self, name):
+        """
+        One column as pd.read_csv() would give it: int64, float64 with NaN
+        for an integer column with blanks, strings (NaN for blanks) otherwise.
+        """
+        number = self.columns.index(name)
+        arrays = {suffix: self._arrays[f'c{number}_{suffix}'] for suffix in ('rows', 'values')
+                  if f'c{number}_{suffix}' in self._arrays}
+        values = _decode_ints(str(self._arrays['encodings'][number]), arrays, self.rows)
+        blank = self._blank(number)
+        if str(self._arrays['kinds'][number]) == 'text':
+            table = self._arrays[f'c{number}_table'].astype(object)
+            values = table[values] if len(table) else np.full(self.rows, None, dtype=object)
+            if blank is not None:
+                values[blank] = None
+            return pd.Series(values, name=name)
+        if blank is not None and blank.any():
+            values = values.astype(np.float64)
+            values[blank] = np.nan
+        return pd.Series(values, name=name)
+
+    def to_frame(self, columns=None):
+        """The dataset (or just 'columns' of it) as a DataFrame, like pd.read_csv() of the CSV."""
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({name: self.column(name) for name in columns},
+                            columns=columns, index=pd.RangeIndex(self.rows))
+
+    def to_csv_bytes(self):
+        """The CSV text of the dataset, byte for byte as it was packed."""
+        df = self.to_frame()
+        for name in df.columns:
+            if df[name].dtype == np.float64:
+                df[name] = df[name].astype('Int64')
+        out = io.StringIO()
+        df.to_csv(out, index=False, lineterminator=self.line_terminator)
+        return out.getvalue().encode()
+
+
+def _read_text(csv_path):
+    """(fields as strings, line terminator) of a processed CSV."""
+    with open(csv_path, 'rb') as f:
+        first = f.readline()
+    terminator = '\r\n' if first.endswith(b'\r\n') else '\n'
+    text = pd.read_csv(csv_path, dtype=str, keep_default_na=False, na_filter=False)
+    return text, terminator
+
+
+def pack_csv(csv_path, output_path=None):
+    """
+    Packs a processed CSV ('output_path' defaults to default_packed()).
+    Returns (output_path, CSV bytes, packed bytes). Raises ValueError if
+    the file wouldn't come back byte for byte (quoted fields, odd spacing).
+    """
+    csv_path = Path(csv_path)
+    output_path = Path(output_path) if output_path is not None else default_packed(csv_path)
+    text, terminator = _read_text(csv_path)
+    arrays = encode_frame(text)
+    arrays['version'] = np.array([FORMAT_VERSION])
+    arrays['line_terminator'] = np.array([terminator], dtype=str)
+
+    # Written next to the target and renamed, like the cache files
+    tmp = output_path.with_name(output_path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    try:
+        if PackedDataset(tmp).to_csv_bytes() != csv_path.read_bytes():
+            raise ValueError(f"{csv_path.name} doesn't round-trip through the packed format")
+    except Exception:
+        tmp.unlink()
+        raise
+    tmp.replace(output_path)
+    return output_path, csv_path.stat().st_size, output_path.stat().st_size
+
+
+def unpack_csv(packed_path, csv_path=None):
+    """Writes a packed file back out as its original CSV ('<name>.csv' next to it by default)."""
+    packed_path = Path(packed_path)
+    csv_path = Path(csv_path) if csv_path is not None else packed_path.with_suffix('.csv')
+    csv_path.write_bytes(PackedDataset(packed_path).to_csv_bytes())
+    return csv_path
+
+
+def read_packed(path):
+    """The whole packed dataset as a DataFrame, as pd.read_csv() gives the CSV."""
+    return PackedDataset(path).to_frame()
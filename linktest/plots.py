@@ -0,0 +1,289 @@
+"""
+The standard figures, shared by the per-day scripts and 'python -m linktest'.
+
+- config_graphs(): testgraphs.py's per-config success rate, packets per
+  second and time delay plots for one processed file
+- distance_figure(): distance_analysis.py's packets per second against
+  distance, one panel per data rate
+- can_timing_figure(): can_analysis.py's inter-arrival and burst-loss
+  histograms per CAN ID
+Figures go through render.finish_figure(), so they are shown or, headless,
+saved and closed.
+"""
+import bisect
+from pathlib import Path
+
+import numpy as np
+
+from .cache import load_csv
+from .can_timing import burst_lengths, gap_cycles, reception_times
+from .metrics import delay_bins, delay_table, second_counts, standard_columns
+from .pyramid import load_pyramid
+from .render import finish_figure, plt
+
+
+def config_graphs(csv_path, graphs_dir, bin_size=100):
+    """
+    testgraphs.py's five per-config figures for one processed file: success
+    rate and packets per second per 'bin_size' ms bin (from the file's
+    packet-rate pyramid), packets per second of host time and the
+    host-vs-Teensy time delay, raw and averaged.
+    """
+    # Get CSV filename without extension for graph titles
+    csv_name = Path(csv_path).stem
+
+    # Typed frame from the cache, Timestamp already parsed to datetime
+    df = standard_columns(load_csv(csv_path))
+
+    # Success rate and packets per second for every DataRate-PowerLevel combination
+    bins = load_pyramid(csv_path).bins(bin_size)
+    seconds = second_counts(df)
+    delays = delay_table(df)
+    avg_delays = delay_bins(df)
+
+    # Create separate plots for each metric
+
+    # 1. Success Rate by Configuration
+    plt.figure(figsize=(12, 6))
+    for config, grouped in bins.groupby('Config', sort=False):
+        plt.plot(grouped['bin_start'], grouped['success_rate'],
+                marker='o', linestyle='-', label=config)
+
+    plt.title("Success Rate by Configuration")
+    plt.xlabel("Milliseconds")
+    plt.ylabel("Success Rate (%)")
+    plt.grid(True)
+    plt.legend()
+
+    # Add minor ticks
+    plt.minorticks_on()
+    plt.grid(True, which='major', linestyle='-')
+    plt.grid(True, which='minor', linestyle=':', alpha=0.5)
+
+    plt.tight_layout()
+    # Delete existing file if it exists
+    outfile = graphs_dir / f"{csv_name}_success_rate.png"
+    if outfile.exists():
+        outfile.unlink()
+    finish_figure(outfile)
+
+    # 2. Packets per Second by Configuration
+    plt.figure(figsize=(12, 6))
+    for config, grouped in bins.groupby('Config', sort=False):
+        plt.plot(grouped['bin_start'], grouped['packets_per_second'],
+                marker='o', linestyle='-', label=config)
+
+    plt.title("Packets Per Second by Configuration")
+    plt.xlabel("Milliseconds")
+    plt.ylabel("Packets per Second")
+    plt.grid(True)
+    plt.legend()
+
+    # Add minor ticks
+    plt.minorticks_on()
+    plt.grid(True, which='major', linestyle='-')
+    plt.grid(True, which='minor', linestyle=':', alpha=0.5)
+
+    plt.tight_layout()
+    # Delete existing file if it exists
+    outfile = graphs_dir / f"{csv_name}_packets_per_second.png"
+    if outfile.exists():
+        outfile.unlink()
+    finish_figure(outfile)
+
+    # 3. Time Series by Second for each Configuration
+    plt.figure(figsize=(12, 6))
+    # Packets counted per second from the start of each config, sorted by elapsed seconds
+    for config, second_grouped in seconds.groupby('Config', sort=False):
+        plt.plot(second_grouped['ElapsedSeconds'], second_grouped['packets'],
+                marker='o', linestyle='-', label=config)
+
+    plt.title(f"Packets per Second by Configuration - {csv_name}")
+    plt.xlabel("Elapsed Time (seconds)")
+    plt.ylabel("Number of Packets")
+    plt.grid(True)
+    plt.legend()
+
+    # Set x-axis ticks every 5 seconds up to max time
+    max_seconds = int(second_grouped['ElapsedSeconds'].max())
+    plt.xticks(range(0, max_seconds + 5, 5))
+
+    # Add minor ticks
+    plt.minorticks_on()
+    plt.grid(True, which='major', linestyle='-')
+    plt.grid(True, which='minor', linestyle=':', alpha=0.5)
+
+    plt.tight_layout()
+    # Delete existing file if it exists
+    outfile = graphs_dir / f"{csv_name}_timeseries.png"
+    if outfile.exists():
+        outfile.unlink()
+    finish_figure(outfile)
+
+    # 4. Time Delay Analysis
+    plt.figure(figsize=(12, 6))
+    # Delay = timestamp elapsed - millis elapsed, both from the start of each config
+    for config, config_data in delays.groupby('Config', sort=False):
+        plt.plot(config_data['Index'], config_data['TimeDelay'],
+                marker='o', linestyle='-', label=config)
+
+    plt.title(f"Time Delay Analysis - {csv_name}")
+    plt.xlabel("Packet Index")
+    plt.ylabel("Time Delay (ms)")
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    # Only shown interactively, headless runs save it too
+    finish_figure(graphs_dir / f"{csv_name}_time_delay.png", interactive_save=False)
+
+    # 5. Time Delay Analysis (Averaged)
+    plt.figure(figsize=(12, 6))
+    # Delay (millis - timestamp) averaged over bins of 100 rows, mean index on the x-axis
+    for config, delay_grouped in avg_delays.groupby('Config', sort=False):
+        plt.plot(delay_grouped['bin_index'], delay_grouped['avg_delay'],
+                marker='o', linestyle='-', label=config)
+
+    plt.title(f"Average Time Delay Analysis (per 600 packets) - {csv_name}")
+    plt.xlabel("Packet Index")
+    plt.ylabel("Average Time Delay (ms)")
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    # Only shown interactively, headless runs save it too
+    finish_figure(graphs_dir / f"{csv_name}_time_delay_avg.png", interactive_save=False)
+
+
+def distance_figure(results, outfile):
+    """
+    Packets per second against distance for every config, one panel per data
+    rate. 'results' is {config: {'distances': [...], 'pps': [...]}} as
+    returned by distance.pps_by_distance(); distances a config is missing at
+    are filled into it as 0 pps.
+    """
+    # Initialize dr_configs dictionary to group configurations by data rate
+    dr_configs = {
+        'DR250': [],
+        'DR1': [],
+        'DR2': []
+    }
+
+    # Group configurations by data rate
+    for config in results.keys():
+        if 'DR250' in config:
+            dr_configs['DR250'].append(config)
+        elif 'DR1' in config:
+            dr_configs['DR1'].append(config)
+        elif 'DR2' in config:
+            dr_configs['DR2'].append(config)
+
+    # Define color scheme for power levels (same across all data rates)
+    color_schemes = {
+        'PL0': '#0066FF',  # Blue
+        'PL1': '#33CC33',  # Green
+        'PL2': '#FFD700',  # Yellow
+        'PL3': '#FF0000'   # Red
+    }
+
+    # Define markers for power levels
+    markers = {
+        'PL0': 's',  # square
+        'PL1': '^',  # triangle
+        'PL2': 'o',  # circle
+        'PL3': '*'   # star
+    }
+
+    # Create figure with three subplots sharing y-axis
+    fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(15, 5), sharey=True)
+    axes = {'DR250': ax1, 'DR1': ax2, 'DR2': ax3}
+
+    # Add all possible distances to results
+    all_distances = set()
+    for config_data in results.values():
+        all_distances.update(config_data['distances'])
+    all_distances = sorted(all_distances)
+
+    # Fill in zeros for missing distances
+    for config in results:
+        existing_distances = set(results[config]['distances'])
+        for distance in all_distances:
+            if distance not in existing_distances:
+                idx = bisect.bisect_left(results[config]['distances'], distance)
+                results[config]['distances'].insert(idx, distance)
+                results[config]['pps'].insert(idx, 0)
+
+    # Plot data for each data rate in separate subplots
+    for dr, configs in dr_configs.items():
+        ax = axes[dr]
+        for config in sorted(configs):
+            if config in results:
+                distances = np.array(results[config]['distances'])
+                pps = np.array(results[config]['pps'])
+                sort_idx = np.argsort(distances)
+
+                # Extract power level from config string
+                pl = config.split('_')[1]  # Gets 'PL0', 'PL1', etc.
+
+                ax.plot(distances[sort_idx], pps[sort_idx],
+                       marker=markers[pl],
+                       color=color_schemes[pl],  # Simplified color lookup
+                       linestyle='-',
+                       alpha=0.5,
+                       label=config,
+                       markersize=10,
+                       markeredgewidth=1,
+                       markeredgecolor='black',
+                       linewidth=1)
+
+        # Customize each subplot
+        ax.set_title(f"{dr} Data Rate")
+        ax.set_xlabel("Distance (m)")
+        ax.grid(True, which='major', linestyle='-', alpha=0.3)
+        ax.grid(True, which='minor', linestyle=':', alpha=0.2)
+        ax.minorticks_on()
+        ax.legend(bbox_to_anchor=(0.5, -0.15), loc='upper center')
+
+    # Add common y-label
+    fig.text(0.04, 0.5, 'Packets per Second', va='center', rotation='vertical')
+
+    # Adjust layout to prevent overlap
+    plt.tight_layout()
+
+    # Delete existing file if it exists
+    outfile = Path(outfile)
+    if outfile.exists():
+        outfile.unlink()
+
+    # Save with extra space for legends
+    finish_figure(outfile, bbox_inches='tight', dpi=300)
+
+
+def can_timing_figure(log, name, graphs_dir):
+    """Inter-arrival and burst-loss histograms, one column per CAN ID"""
+    fig, axes = plt.subplots(2, len(log.ids), figsize=(4 * len(log.ids), 7), squeeze=False)
+    for column, can_id in enumerate(log.ids):
+        frames = log.frames_for(can_id)
+        gaps, _, period = gap_cycles(reception_times(frames))
+        bursts = burst_lengths(frames)
+
+        # Time between receptions, with the nominal period marked
+        ax = axes[0, column]
+        if len(gaps):
+            ax.hist(gaps, bins=np.arange(0, gaps.max() + 2) - 0.5, color='tab:blue')
+            ax.axvline(period, color='red', linestyle='--', label=f'period {period:.0f} ms')
+            ax.legend()
+        ax.set_title(f"0x{int(can_id):X}")
+        ax.set_xlabel("Time between frames (ms)")
+        ax.set_yscale('log')
+        ax.grid(True, alpha=0.3)
+
+        # How many frames in a row were lost each time the link dropped out
+        ax = axes[1, column]
+        if len(bursts):
+            ax.hist(bursts, bins=np.arange(1, bursts.max() + 2) - 0.5, color='tab:orange')
+        ax.set_xlabel("Consecutive frames missed")
+        ax.grid(True, alpha=0.3)
+    axes[0, 0].set_ylabel("Count")
+    axes[1, 0].set_ylabel("Bursts")
+    fig.suptitle(f"CAN frame timing - {name}")
+    plt.tight_layout()
+    finish_figure(graphs_dir / f"{name}_can_timing.png", dpi=150)
@@ -0,0 +1,153 @@
+"""
+Packet-rate pyramids: received/expected counts per config at several bin sizes.
+
+bin_metrics() re-bins every row of a file for each bin size asked for, so
+zooming out or trying another bin size meant rescanning the whole file.
+pyramid_table() bins a processed file once at the finest level and sums
+those bins up into every coarser one in LEVELS_MS. load_pyramid() caches
+the table next to the parsed data (linktest.cache), and Pyramid.bins()
+answers any multiple of 10 ms over any time range from the coarsest level
+that divides it: a binary search for the range, then one summing pass over
+bin_size / level stored bins per bin returned. That is under ten for the
+usual sizes (100 ms, 500 ms, 5 s, 2 min), but sizes no coarser level
+divides sum more (110 ms adds up eleven 10 ms bins, 990 ms ninety-nine).
+The table it returns has the same columns and values as bin_metrics() on
+the whole file.
+"""
+import numpy as np
+import pandas as pd
+
+from .cache import load_csv
+from .metrics import config_codes, standard_columns
+
+LEVELS_MS = (10, 100, 1000, 10000, 60000)
+
+BIN_COLUMNS = ['Config', 'Bin', 'bin_start', 'count', 'successes', 'success_rate',
+               'packets_per_second']
+
+
+def _sum_bins(codes, bins, counts, successes):
+    """Adds up rows that share (code, bin); the rows must be sorted by both."""
+    if len(bins) == 0:
+        return codes, bins, counts, successes
+    starts = np.flatnonzero(np.r_[True, (np.diff(codes) != 0) | (np.diff(bins) != 0)])
+    return (codes[starts], bins[starts], np.add.reduceat(counts, starts),
+            np.add.reduceat(successes, starts))
+
+
+def pyramid_table(df, time_column='Millis'):
+    """
+    Rows logged ('count') and received ('successes') per config and bin at
+    every level of LEVELS_MS. Columns: level, Config, Bin, count,
+    successes; sorted by level, config (in order of first appearance, as
+    config_codes() numbers them) and bin. Empty bins aren't stored.
+    """
+    codes, labels = config_codes(df)
+    keep = codes >= 0
+    millis = df[time_column].to_numpy(dtype=np.int64, na_value=0)[keep]
+    indicator = df['Indicator'].to_numpy(dtype=np.int64, na_value=0)[keep]
+    codes = codes[keep].astype(np.int64)
+
+    # Finest level straight from the rows
+    order = np.lexsort((millis, codes))
+    level = (codes[order], millis[order] // LEVELS_MS[0],
+             np.ones(len(order), dtype=np.int64), indicator[order])
+    level = _sum_bins(*level)
+
+    tables = []
+    previous = LEVELS_MS[0]
+    for size in LEVELS_MS:
+        if size != previous:
+            # Sorted bins stay sorted after dividing, so each level sums the one below
+            level = _sum_bins(level[0], level[1] // (size // previous), level[2], level[3])
+            previous = size
+        tables.append(pd.DataFrame({
+            'level': np.full(len(level[0]), size, dtype=np.int32),
+            'Config': np.asarray(labels, dtype=object)[level[0]],
+            'Bin': level[1],
+            'count': level[2],
+            'successes': level[3],
+        }))
+    return pd.concat(tables, ignore_index=True)
+
+
+class Pyramid:
+    """
+    A pyramid_table() split into sorted arrays per (level, config), for
+    bins() to slice. 'configs' lists the configs in file order.
+    """
+
+    def __init__(self, table):
+        self.configs = list(pd.unique(table['Config']))
+        self._arrays = {}
+        for (level, config), rows in table.groupby(['level', 'Config'], sort=False):
+            self._arrays[(int(level), config)] = (rows['Bin'].to_numpy(dtype=np.int64),
+                                                  rows['count'].to_numpy(dtype=np.int64),
+                                                  rows['successes'].to_numpy(dtype=np.int64))
+
+    def extent(self):
+        """(first, last) millis covered by any config, or (None, None) when empty."""
+        finest = [arrays[0] for (level, _), arrays in self._arrays.items()
+                  if level == LEVELS_MS[0] and len(arrays[0])]
+        if not finest:
+            return None, None
+        return (min(int(b[0]) for b in finest) * LEVELS_MS[0],
+                (max(int(b[-1]) for b in finest) + 1) * LEVELS_MS[0])
+
+    def level_bins(self, level, config, start=None, end=None):
+        """
+        (Bin, count, successes) arrays of one config at one level of
+        LEVELS_MS, for the bins that overlap [start, end) millis. Views into
+        the pyramid, found by binary search; empty for unknown configs.
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        bins, counts, successes = self._arrays.get((level, config), (empty, empty, empty))
+        lo = 0 if start is None else np.searchsorted(bins, start // level)
+        hi = len(bins) if end is None else np.searchsorted(bins, -(-end // level))
+        return bins[lo:hi], counts[lo:hi], successes[lo:hi]
+
+    def bins(self, bin_size=100, start=None, end=None, configs=None):
+        """
+        bin_metrics()-style table (BIN_COLUMNS) for 'bin_size' ms bins.
+
+        - 'bin_size' has to be a multiple of the finest level, 10 ms; each
+          bin sums bin_size / level bins of the coarsest level dividing it
+        - 'start'/'end' (millis) keep the bins that overlap [start, end)
+        - 'configs' picks configs by label; all of them by default
+        """
+        if bin_size <= 0 or bin_size % LEVELS_MS[0]:
+            raise ValueError(f"bin_size must be a multiple of {LEVELS_MS[0]} ms, not {bin_size}")
+        level = max(size for size in LEVELS_MS if bin_size % size == 0)
+        factor = bin_size // level
+
+        # Widen the range to whole output bins so the first and last aren't cut short
+        if start is not None:
+            start = (start // bin_size) * bin_size
+        if end is not None:
+            end = -(-end // bin_size) * bin_size
+
+        parts = []
+        for config in (self.configs if configs is None else configs):
+            bins, counts, successes = self.level_bins(level, config, start, end)
+            if len(bins) == 0:
+                continue
+            merged = _sum_bins(np.zeros(len(bins), dtype=np.int64), bins // factor,
+                               counts, successes)
+            parts.append(pd.DataFrame({'Config': config, 'Bin': merged[1],
+                                       'count': merged[2], 'successes': merged[3]}))
+
+        if not parts:
+            return pd.DataFrame(columns=BIN_COLUMNS)
+        table = pd.concat(parts, ignore_index=True)
+        table['bin_start'] = table['Bin'] * bin_size
+        table['success_rate'] = (table['successes'] / table['count']) * 100
+        table['packets_per_second'] = table['successes'] * (1000 / bin_size)
+        return table[BIN_COLUMNS]
+
+
+def load_pyramid(csv_path):
+    """Pyramid of a processed CSV, built on first use and cached alongside its parsed data."""
+    table = load_csv(csv_path,
+                     parse=lambda path: pyramid_table(standard_columns(load_csv(path))),
+                     kind='pyramid')
+    return Pyramid(table)
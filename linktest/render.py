@@ -0,0 +1,49 @@
+"""
+Headless plot rendering for batch runs.
+
+With LINKTEST_HEADLESS=1 in the environment (or after use_headless()) the
+scripts switch matplotlib to the non-interactive Agg backend, save every
+figure without opening a window and close it straight after, so a whole
+directory renders unattended on a server and memory doesn't grow from
+file to file. Without it the scripts behave as before and show each figure.
+"""
+import os
+from pathlib import Path
+
+import matplotlib
+
+from .instrument import stage
+
+HEADLESS = os.environ.get('LINKTEST_HEADLESS', '') not in ('', '0')
+if HEADLESS:
+    matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt  # noqa: E402  (backend has to be picked first)
+
+
+def use_headless():
+    """Switches to headless rendering for the rest of the run."""
+    global HEADLESS
+    HEADLESS = True
+    plt.close('all')
+    plt.switch_backend('Agg')
+
+
+def finish_figure(outfile=None, interactive_save=True, **savefig_kwargs):
+    """
+    Saves the current figure to 'outfile' and then either shows it or, in
+    headless mode, closes it.
+
+    - 'interactive_save' False keeps the old show-only behaviour for figures
+      that were never written to disk; headless runs save them anyway since
+      nobody is watching the screen
+    - extra keyword arguments go to savefig (dpi, bbox_inches, facecolor...)
+    """
+    fig = plt.gcf()
+    if outfile is not None and (HEADLESS or interactive_save):
+        with stage('save', file=Path(outfile).name):
+            fig.savefig(outfile, **savefig_kwargs)
+    if HEADLESS:
+        plt.close(fig)
+    else:
+        plt.show()
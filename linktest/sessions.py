@@ -0,0 +1,148 @@
+"""
+Session splitter for raw captures holding more than one test run.
+
+readserial.py appends, so one file can hold several sessions. Each starts
+with a fresh 'HH:MM:SS,Timestamp,Index,...' header row, or shows up as the
+Teensy's Index or millis going back when it was reset without restarting
+the logger. Gap-filling such a file as one table lets later sessions
+overwrite earlier ones index by index. split_sessions() finds the session
+boundaries in one pass over the lines and writes each session to its own
+raw file, plus an index table describing them, so each can be gap-filled
+on its own (and in parallel).
+
+A single corrupt line (an index or millis spike with the lines either side
+carrying on as normal) is dropped rather than taken as a reset; one row of
+lookahead is enough to tell the two apart.
+"""
+from pathlib import Path
+
+import pandas as pd
+
+from .layout import sniff_layout
+
+INDEX_COLUMNS = ['session', 'file', 'reason', 'first_line', 'last_line', 'rows',
+                 'dropped', 'first_index', 'last_index', 'first_millis',
+                 'last_millis', 'start_time', 'end_time']
+
+
+def _is_outlier(last, row, following):
+    """
+    True if 'row' is a one-line spike: 'following' carries on from 'last'
+    but 'row' doesn't fit between them. Rows are (millis, index, ...).
+    """
+    if last is None or following is None:
+        return False
+    if not (last[1] <= following[1] and last[0] <= following[0]):
+        return False
+    return not (last[1] <= row[1] <= following[1] and last[0] <= row[0] <= following[0])
+
+
+def session_rows(lines, names):
+    """
+    Streams (reason, row) pairs from raw capture lines, where 'reason' is
+    None within a session and 'start', 'header', 'index_reset' or
+    'millis_rollback' on the first row of each session. A row is (millis,
+    index, time, line_number, line). One-line spikes come through with
+    reason 'dropped'; broken lines are skipped.
+    """
+    millis_at = names.index('Millis')
+    index_at = names.index('Index')
+    time_at = names.index('Timestamp') if 'Timestamp' in names else None
+    fields = len(names)
+
+    last = None       # last row kept
+    pending = None    # row waiting for one line of lookahead
+    boundary = 'start'
+
+    def commit(row):
+        nonlocal last, boundary
+        reason = boundary
+        if reason is None and (row[1] < last[1] or row[0] < last[0]):
+            reason = 'index_reset' if row[1] < last[1] else 'millis_rollback'
+        boundary = None
+        last = row
+        return reason, row
+
+    for number, line in enumerate(lines, 1):
+        parts = line.strip().split(',')
+        try:
+            if len(parts) != fields:
+                raise ValueError
+            row = (int(parts[millis_at]), int(parts[index_at]),
+                   parts[time_at] if time_at is not None else None, number, line)
+        except ValueError:
+            if 'Index' in parts:
+                # Header row: the logger was restarted
+                if pending is not None:
+                    yield commit(pending)
+                    pending = None
+                boundary = 'header'
+                last = None
+            continue
+
+        if pending is not None:
+            if _is_outlier(last, pending, row):
+                yield 'dropped', pending
+            else:
+                yield commit(pending)
+        pending = row
+    if pending is not None:
+        yield commit(pending)
+
+
+def split_sessions(path, out_dir=None):
+    """
+    Writes every session of a raw capture to '<stem>_sNN.csv' (the raw lines
+    unchanged, header rows left out) in 'out_dir', by default a
+    '<stem>_sessions' folder next to the capture, together with the index
+    table '<stem>_sessions.csv'. Returns the index as a DataFrame, one row
+    per session with its file, what started it, its line range and its
+    Index / millis / host time span.
+    """
+    path = Path(path)
+    layout, names = sniff_layout(path)
+    if layout != 'raw':
+        raise ValueError(f"{path.name} is not a raw capture")
+    out_dir = Path(out_dir) if out_dir is not None else path.with_name(f"{path.stem}_sessions")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    sessions = []
+    current = None
+    out = None
+    try:
+        with open(path, 'r', newline='') as lines:
+            for reason, row in session_rows(lines, names):
+                millis, index, time, number, line = row
+                if reason == 'dropped':
+                    if current is not None:
+                        current['dropped'] += 1
+                    continue
+                if reason is not None:
+                    if out is not None:
+                        out.close()
+                    current = {
+                        'session': len(sessions) + 1,
+                        'file': f"{path.stem}_s{len(sessions) + 1:02d}.csv",
+                        'reason': reason,
+                        'first_line': number,
+                        'rows': 0,
+                        'dropped': 0,
+                        'first_index': index,
+                        'first_millis': millis,
+                        'start_time': time,
+                    }
+                    sessions.append(current)
+                    out = open(out_dir / current['file'], 'w', newline='')
+                out.write(line)
+                current['rows'] += 1
+                current['last_line'] = number
+                current['last_index'] = index
+                current['last_millis'] = millis
+                current['end_time'] = time
+    finally:
+        if out is not None:
+            out.close()
+
+    index_table = pd.DataFrame(sessions, columns=INDEX_COLUMNS)
+    index_table.to_csv(out_dir / f"{path.stem}_sessions.csv", index=False)
+    return index_table
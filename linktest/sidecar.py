@@ -0,0 +1,194 @@
+"""
+Fixed-width binary sidecar for the processed ...new.csv datasets.
+
+write_sidecar() stores a processed dataset as packed records next to the
+CSV ('foo.csv' -> 'foo.rec'): a short JSON header padded to 64 bytes, then
+one fixed-size record per row. open_sidecar() np.memmaps the records, so a
+time range comes back as a view of just those rows. The rest of the file
+is never read or copied, and the OS page cache shares it between runs.
+
+Blank fields (the rows before the first received index) are stored as -1
+in signed columns and the type's maximum in unsigned ones, and HH:MM:SS
+host times as seconds since midnight. to_frame() turns them back into the
+same frame load_csv() gives.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .cache import load_csv
+from .loader import INT_COLUMNS, NULLABLE, TIME_COLUMNS
+
+MAGIC = b'LTREC1\n'
+HEADER_ALIGN = 64
+SIDECAR_SUFFIX = '.rec'
+
+# Teensy clock column the records are searched on, in order of preference
+TIME_KEYS = ('Millis', 'Timestamp_ms')
+
+
+def _blank(dtype):
+    """Value standing in for a blank field of 'dtype'."""
+    info = np.iinfo(dtype)
+    return -1 if info.min < 0 else info.max
+
+
+def _column_dtype(name):
+    if name in INT_COLUMNS:
+        return np.dtype(INT_COLUMNS[name])
+    if name in TIME_COLUMNS:
+        return np.dtype(np.int32)  # seconds since midnight
+    raise ValueError(f"No fixed-width type for column {name!r}")
+
+
+def sidecar_path(csv_path):
+    return Path(csv_path).with_suffix(SIDECAR_SUFFIX)
+
+
+def _segments(times):
+    """Start rows of the runs where the time column never goes backwards."""
+    if len(times) < 2:
+        return [0]
+    back = np.flatnonzero(np.diff(times) < 0) + 1
+    return [0] + back.tolist()
+
+
+def write_sidecar(csv_path, df=None):
+    """
+    Writes the sidecar for a processed CSV ('df' is its parsed frame, loaded
+    through the cache when not given) and returns its path.
+    """
+    csv_path = Path(csv_path)
+    if df is None:
+        df = load_csv(csv_path)
+    dtype = np.dtype([(name, _column_dtype(name)) for name in df.columns])
+    records = np.empty(len(df), dtype=dtype)
+    clock_columns = []
+    for name in df.columns:
+        column = df[name]
+        if name in TIME_COLUMNS and pd.api.types.is_datetime64_any_dtype(column):
+            column = (column - column.dt.normalize()).dt.total_seconds()
+            clock_columns.append(name)
+        records[name] = column.to_numpy(dtype=np.float64, na_value=_blank(dtype[name]))
+
+    time_column = next((name for name in TIME_KEYS if name in df.columns), None)
+    header = {
+        'columns': [[name, dtype[name].str] for name in df.columns],
+        'clock_columns': clock_columns,
+        'rows': len(records),
+        'source_mtime_ns': csv_path.stat().st_mtime_ns,
+        'time_column': time_column,
+        'segments': _segments(records[time_column].astype(np.int64)
+                              if time_column else np.empty(0)),
+    }
+    text = MAGIC + json.dumps(header).encode() + b'\n'
+    text += b' ' * (-len(text) % HEADER_ALIGN)
+
+    path = sidecar_path(csv_path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(text)
+        records.tofile(f)
+    os.replace(tmp, path)
+    return path
+
+
+def _read_header(path):
+    """(header dict, byte offset of the first record)."""
+    with open(path, 'rb') as f:
+        if f.readline() != MAGIC:
+            raise ValueError(f"{path} is not a sidecar file")
+        header = json.loads(f.readline())
+        offset = f.tell()
+    return header, offset + (-offset % HEADER_ALIGN)
+
+
+class Sidecar:
+    """
+    Memory-mapped records of one processed dataset.
+
+    - 'records' is the read-only memmap, one field per CSV column
+    - 'time_column' is the Teensy clock column time_range() searches
+    """
+
+    def __init__(self, path):
+        header, offset = _read_header(path)
+        dtype = np.dtype([(name, code) for name, code in header['columns']])
+        self.path = Path(path)
+        self.header = header
+        self.time_column = header['time_column']
+        self.segments = header['segments'] + [header['rows']]
+        if header['rows']:
+            self.records = np.memmap(path, dtype=dtype, mode='r', offset=offset,
+                                     shape=(header['rows'],))
+        else:
+            self.records = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _bisect(self, lo, hi, value, right):
+        """Binary search on the memmap without copying the time column out."""
+        times = self.records[self.time_column]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[mid] < value or (right and times[mid] == value):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def time_range(self, t0, t1):
+        """
+        Records with t0 <= time <= t1 on the Teensy clock. A file with one
+        session gives a view into the memmap; multi-session files (the clock
+        going backwards) give the matching rows of every session, copied.
+        """
+        if self.time_column is None:
+            raise ValueError(f"{self.path.name} has no Teensy clock column")
+        parts = []
+        for start, end in zip(self.segments[:-1], self.segments[1:]):
+            # Leading blank rows hold -1, below any real time
+            lo = self._bisect(start, end, t0, right=False)
+            hi = self._bisect(lo, end, t1, right=True)
+            if hi > lo:
+                parts.append(self.records[lo:hi])
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else self.records[:0]
+
+    def to_frame(self, records=None):
+        """DataFrame of 'records' (all of them by default) typed like load_csv()."""
+        records = self.records if records is None else records
+        df = pd.DataFrame(index=pd.RangeIndex(len(records)))
+        for name in records.dtype.names:
+            values = np.asarray(records[name])
+            blank = values == _blank(values.dtype)
+            if name in self.header['clock_columns']:
+                times = pd.Timestamp('1900-01-01') + pd.to_timedelta(values, unit='s')
+                df[name] = pd.Series(times).mask(blank)
+            elif blank.any():
+                df[name] = pd.Series(values, dtype=NULLABLE[values.dtype.type]).mask(blank)
+            else:
+                df[name] = values
+        return df
+
+
+def open_sidecar(csv_path, build=True):
+    """
+    Sidecar for a processed CSV, (re)written first when it is missing or
+    older than the CSV and 'build' is True.
+    """
+    path = sidecar_path(csv_path)
+    if build:
+        mtime = Path(csv_path).stat().st_mtime_ns
+        try:
+            fresh = _read_header(path)[0]['source_mtime_ns'] == mtime
+        except (OSError, ValueError):
+            fresh = False
+        if not fresh:
+            write_sidecar(csv_path)
+    return Sidecar(path)
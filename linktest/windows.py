@@ -0,0 +1,145 @@
+"""
+Stable test windows found from the data instead of picked by hand.
+
+Each file is split into runs of one DataRate x PowerLevel config. Runs
+shorter than the switch bounce time are dropped (the rotary switch resting
+between two positions flickers the config for a few hundred ms) and the
+runs either side merged, a second is trimmed off each end for the switch
+transition, and the steadiest 30 s of what is left is picked with a sliding
+window over per-second packet counts. The resulting window table replaces
+the hand-written CONFIG_WINDOWS, which had inverted windows in it that
+silently produced nonsense packets per second.
+"""
+import numpy as np
+import pandas as pd
+
+from .cache import load_csv
+from .metrics import config_codes
+
+WINDOW_MS = 30000  # length of the window picked per config
+TRIM_MS = 1000     # cut off each end of a run for the switch transition
+BOUNCE_MS = 500    # runs shorter than this are switch bounce
+BIN_MS = 1000      # packet counts are binned per second for the steadiness score
+
+
+def config_runs(df, bounce_ms=BOUNCE_MS):
+    """
+    Contiguous stretches of one config in file order.
+
+    - stretches shorter than 'bounce_ms' are dropped, and the neighbours
+      either side merged when they are the same config
+    Columns: Config, code, start_row, end_row (exclusive), start_millis,
+    end_millis.
+    """
+    codes, labels = config_codes(df)
+    millis = df['Millis'].to_numpy(dtype=np.float64, na_value=np.nan)
+    if len(codes) == 0:
+        return pd.DataFrame(columns=['Config', 'code', 'start_row', 'end_row',
+                                     'start_millis', 'end_millis'])
+
+    change = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.r_[0, change]
+    ends = np.r_[change, len(codes)]
+    run_codes = codes[starts]
+    start_ms = millis[starts]
+    end_ms = millis[ends - 1]
+
+    # NaN millis (blank leading rows) compare False and drop out here too
+    keep = (run_codes >= 0) & (end_ms - start_ms >= bounce_ms)
+    starts, ends, run_codes = starts[keep], ends[keep], run_codes[keep]
+    start_ms, end_ms = start_ms[keep], end_ms[keep]
+
+    # Merge neighbours of the same config that a bounce had split
+    first = np.flatnonzero(np.r_[True, run_codes[1:] != run_codes[:-1]])
+    last = np.r_[first[1:] - 1, len(run_codes) - 1]
+    return pd.DataFrame({
+        'Config': np.asarray(labels, dtype=object)[run_codes[first]],
+        'code': run_codes[first],
+        'start_row': starts[first],
+        'end_row': ends[last],
+        'start_millis': start_ms[first],
+        'end_millis': end_ms[last],
+    })
+
+
+def steadiest_window(millis, received, start, end, window_ms=WINDOW_MS, bin_ms=BIN_MS):
+    """
+    Steadiest 'window_ms' stretch of [start, end].
+
+    Received packets are counted per 'bin_ms' bin and a window of bins slides
+    over them with running sums, so the search is linear in the run length.
+    The window with the lowest coefficient of variation (std / mean of the
+    per-bin counts) wins; windows with no packets at all are never picked.
+    Returns (start, end, cv). A run shorter than 'window_ms' is returned whole.
+    """
+    nbins = int((end - start) // bin_ms)
+    bins = ((millis - start) // bin_ms).astype(np.int64)
+    inside = (bins >= 0) & (bins < nbins)
+    counts = np.bincount(bins[inside], weights=received[inside], minlength=nbins)
+
+    width = window_ms // bin_ms
+    if nbins <= width:
+        mean = counts.mean() if nbins else 0.0
+        cv = counts.std() / mean if mean > 0 else np.inf
+        return start, end, cv
+
+    sums = np.r_[0.0, np.cumsum(counts)]
+    squares = np.r_[0.0, np.cumsum(counts * counts)]
+    mean = (sums[width:] - sums[:-width]) / width
+    var = np.maximum((squares[width:] - squares[:-width]) / width - mean * mean, 0.0)
+    cv = np.full(len(mean), np.inf)
+    np.divide(np.sqrt(var), mean, out=cv, where=mean > 0)
+
+    best = int(np.argmin(cv))
+    return start + best * bin_ms, start + (best + width) * bin_ms, cv[best]
+
+
+def stable_windows(df, window_ms=WINDOW_MS, trim_ms=TRIM_MS, bounce_ms=BOUNCE_MS,
+                   bin_ms=BIN_MS):
+    """
+    Window table for one dataset: one row per config with the steadiest
+    'window_ms' of its runs.
+
+    - only rows of the run's own config count as received, so a window
+      over switch bounce scores as unsteady
+    - a full-length window is preferred over a higher-scoring shorter run
+    Columns: Config, start_millis, end_millis, rows (rows of that config in
+    the window), received (Indicator 1 rows), cv. Rows in first-seen order.
+    """
+    columns = ['Config', 'start_millis', 'end_millis', 'rows', 'received', 'cv']
+    runs = config_runs(df, bounce_ms)
+    codes, _ = config_codes(df)
+    millis = df['Millis'].to_numpy(dtype=np.float64, na_value=np.nan)
+    if 'Indicator' in df:
+        indicator = df['Indicator'].to_numpy(dtype=np.float64, na_value=0)
+    else:
+        indicator = np.ones(len(df))
+
+    candidates = []
+    for run in runs.itertuples(index=False):
+        start = run.start_millis + trim_ms
+        end = run.end_millis - trim_ms
+        if end <= start:
+            continue
+        rows = slice(run.start_row, run.end_row)
+        own = codes[rows] == run.code
+        received = np.where(own, indicator[rows], 0.0)
+        win_start, win_end, cv = steadiest_window(millis[rows], received, start, end,
+                                                  window_ms, bin_ms)
+        in_window = own & (millis[rows] >= win_start) & (millis[rows] <= win_end)
+        candidates.append((run.Config, win_start, win_end, int(in_window.sum()),
+                           int(indicator[rows][in_window].sum()), cv,
+                           win_end - win_start < window_ms, len(candidates)))
+
+    if not candidates:
+        return pd.DataFrame(columns=columns)
+    table = pd.DataFrame(candidates, columns=columns + ['short', 'order'])
+    best = table.sort_values(['short', 'cv', 'order'], kind='stable').drop_duplicates('Config')
+    return best.sort_values('order')[columns].reset_index(drop=True)
+
+
+def load_windows(csv_path, window_ms=WINDOW_MS):
+    """stable_windows() for a CSV, cached next to its parsed data."""
+    return load_csv(csv_path,
+                    parse=lambda path: stable_windows(load_csv(path), window_ms),
+                    kind=f'windows{window_ms}')